@@ -3,18 +3,38 @@
 # Created On: Sep 20, 2025
 
 import logging
+import logging.handlers
+from pathlib import Path
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 
-from app.extensions import db, migrate
+from app.extensions import db, migrate, cache
 from config import LOG_FILE
 
+# Templates rendered by the mailer on hot paths
+EMAIL_TEMPLATES = (
+    "approval.html",
+    "new_user_notification.html",
+    "api_key_recovery.html",
+)
+
 def configure_logging(app:Flask):
     # --- Main application logger ---
-    logging.basicConfig(
-        format='[%(asctime)s] %(levelname)s %(name)s: %(message)s',
-        filename=str(LOG_FILE),
-        datefmt='%d-%b-%Y %I:%M:%S %p'
-    )
+    # Records are buffered in memory and written to the file in batches;
+    # ERROR and above flush the buffer immediately. In debug mode every
+    # record is written straight away so the log can be tailed.
+    root_logger = logging.getLogger()
+    if not root_logger.handlers:
+        file_handler = logging.FileHandler(str(LOG_FILE))
+        file_handler.setFormatter(logging.Formatter(
+            fmt='[%(asctime)s] %(levelname)s %(name)s: %(message)s',
+            datefmt='%d-%b-%Y %I:%M:%S %p'
+        ))
+        root_logger.addHandler(logging.handlers.MemoryHandler(
+            capacity=1 if app.debug else 512,
+            flushLevel=logging.ERROR,
+            target=file_handler
+        ))
 
     if app.debug:
         logging.getLogger().setLevel(logging.DEBUG)
@@ -22,15 +42,63 @@ def configure_logging(app:Flask):
         # Fix werkzeug handler in debug mode
         logging.getLogger('werkzeug').handlers = []
 
+def configure_nplusone(app:Flask):
+    try:
+        from nplusone.ext.flask_sqlalchemy import NPlusOne
+    except ImportError:
+        logging.getLogger(__name__).debug("nplusone not installed; N+1 detection disabled")
+        return
+
+    app.config.setdefault('NPLUSONE_LOGGER', logging.getLogger('nplusone'))
+    app.config.setdefault('NPLUSONE_LOG_LEVEL', logging.WARN)
+    NPlusOne(app)
+
+def configure_templates(app:Flask):
+    # Persist compiled template bytecode across worker restarts. Without an
+    # explicit directory Jinja uses its per-user temp dir (mode 0700, ownership
+    # checked), so no other local user can plant bytecode for the app to load.
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        Path(cache_dir).mkdir(mode=0o700, parents=True, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    else:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+    # Compile the email templates once at startup and keep the Template objects
+    # so the mailer can render them without a loader lookup per send
+    app.extensions["hermes_templates"] = {
+        template_name: app.jinja_env.get_template(template_name)
+        for template_name in EMAIL_TEMPLATES
+    }
+
 def create_app(config_class="config.Config"):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if not app.config.get("API_KEY_HASH_SECRET"):
+        raise RuntimeError(
+            "API_KEY_HASH_SECRET is not set; add one to .env, e.g. the output of "
+            "`python -c \"import secrets; print(secrets.token_hex(32))\"`, "
+            "then run `python -m scripts.cli rehash-api-keys` (see README)"
+        )
+
+    # orjson for jsonify / request.get_json
+    from app.utils.json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
 
     # Configure logging
     configure_logging(app)
 
     db.init_app(app)
     migrate.init_app(app, db)
+    cache.init_app(app)
+
+    # Request logs are written in batches by a background flusher
+    from app.utils.log_buffer import log_buffer
+    log_buffer.init_app(app)
+
+    # Surface lazy-load (N+1) queries during development
+    if app.debug:
+        configure_nplusone(app)
 
     # register blueprints
     from app.home.home import home_bp
@@ -45,4 +113,9 @@ def create_app(config_class="config.Config"):
     from app.api.user_api import user_bp
     app.register_blueprint(user_bp)
 
+    configure_templates(app)
+
+    # Compile the URL matcher now instead of on the first request
+    app.url_map.update()
+
     return app
@@ -1,17 +1,119 @@
 import logging
+from collections import defaultdict
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import raiseload, selectinload
 
-from app.models import User
-from app.extensions import db
+from app.models import User, EmailBot
+from app.extensions import db, cache
 from app.utils.auth import admin_only, log_request
-from app.utils.mailer import send_email
+from app.utils.cache import admin_users_cache_key, invalidate_admin_emails, invalidate_admin_users_cache
+from app.utils.crypto import api_key_hmac, encrypt_value, decrypt_value
+from app.utils.tasks import run_in_background
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 admin_bp = Blueprint("admin_api", __name__, url_prefix="/api/v1/admin")
 
+# Columns needed to serialize a user in the admin listings
+USER_LIST_COLUMNS = (
+    User.id,
+    User.name,
+    User.email,
+    User.api_key_approved,
+    User.is_admin,
+    User.api_key_encrypted,
+    User.api_key_plain_encrypted,
+    User.date_joined,
+    User.hermes_default_usage,
+)
+
+USERS_PAGE_MAX_LIMIT = 500
+USERS_PER_PAGE_MAX = 100
+# Streamed listings larger than this are not buffered for the response cache
+STREAM_CACHE_MAX_CHARS = 1_000_000
+
+
+def _serialize_user_row(u, email_bots, include_keys=True):
+    """
+    Build the admin listing dict for a row selected with USER_LIST_COLUMNS.
+    With include_keys=False the API key fields are left out and nothing is decrypted.
+    """
+    user_data = {
+        "id": u.id,
+        "name": u.name,
+        "email": u.email,
+        "api_key_approved": u.api_key_approved,
+        "is_admin": u.is_admin,
+        "date_joined": u.date_joined,  # serialized natively by the orjson provider
+        "email_bot_count": len(email_bots),
+        "email_bots": email_bots,
+    }
+    if include_keys:
+        user_data["api_key"] = decrypt_value(u.api_key_encrypted) if u.api_key_encrypted else None
+        user_data["api_key_plain"] = (
+            decrypt_value(u.api_key_plain_encrypted)
+            if u.api_key_plain_encrypted else None
+        )
+    return user_data
+
+
+def _serialize_user_rows(users, include_keys=True):
+    """Serialize a page of user rows, loading their bots in one IN query"""
+    bots_by_user = defaultdict(list)
+    if users:
+        bot_rows = db.session.execute(
+            select(EmailBot.user_id, EmailBot.id, EmailBot.username)
+            .where(EmailBot.user_id.in_([u.id for u in users]))
+        ).all()
+        for bot in bot_rows:
+            bots_by_user[bot.user_id].append(
+                {"bot_id": bot.id, "bot_username": bot.username}
+            )
+    return [_serialize_user_row(u, bots_by_user[u.id], include_keys) for u in users]
+
+
+def _user_metrics():
+    """System-wide user metrics, aggregated in the database"""
+    total_users = db.session.execute(select(func.count(User.id))).scalar()
+    total_email_bots = db.session.execute(select(func.count(EmailBot.id))).scalar()
+
+    bot_count = func.count(EmailBot.id).label("email_bot_count")
+    most_email_bots_user = db.session.execute(
+        select(User.id, User.name, bot_count)
+        .outerjoin(EmailBot, EmailBot.user_id == User.id)
+        .group_by(User.id, User.name)
+        .order_by(bot_count.desc())
+        .limit(1)
+    ).first()
+
+    top_3_hermes_users = db.session.execute(
+        select(User.id, User.name, User.hermes_default_usage)
+        .order_by(func.coalesce(User.hermes_default_usage, 0).desc())
+        .limit(3)
+    ).all()
+
+    return {
+        "total_users": total_users,
+        "total_email_bots": total_email_bots,
+        "user_with_most_email_bots": {
+            "id": most_email_bots_user.id,
+            "name": most_email_bots_user.name,
+            "email_bot_count": most_email_bots_user.email_bot_count
+        } if most_email_bots_user else None,
+        "user_with_highest_hermes_usage": {
+            "id": top_3_hermes_users[0].id,
+            "name": top_3_hermes_users[0].name,
+            "hermes_default_usage": top_3_hermes_users[0].hermes_default_usage
+        } if top_3_hermes_users else None,
+        "top_3_hermes_default_users": [
+            {"id": u.id, "name": u.name, "hermes_default_usage": u.hermes_default_usage}
+            for u in top_3_hermes_users
+        ]
+    }
+
 
 @admin_bp.route("/approve-user/<user_id>", methods=["POST"])
 @admin_only
@@ -82,49 +184,76 @@ def approve_user(user_id):
         -H "X-STATIC-KEY: <hermes_static_key>"
     """
     logger.info(f"Admin attempting to approve user {user_id}")
-    user = User.query.get(user_id)
+    user = db.session.execute(
+        select(
+            User.id,
+            User.name,
+            User.email,
+            User.api_key_approved,
+            User.api_key_plain_encrypted,
+        ).where(User.id == user_id)
+    ).first()
     if not user:
         logger.warning(f"User not found for approval: {user_id}")
         return jsonify({"error": "User not found"}), 404
     if user.api_key_approved:
         logger.info(f"User {user_id} already approved")
         return jsonify({"message": "User already approved"}), 200
-    if not user.api_key_plain:
+    if not user.api_key_plain_encrypted:
         logger.warning(f"No pending API key for user {user_id}")
         return jsonify({"error": "No pending API key found for this user"}), 400
 
-    # Use the property setter to encrypt automatically
+    # Move the pending key to the approved column in a single UPDATE;
+    # the approved-flag guard makes concurrent approvals a no-op.
+    api_key = decrypt_value(user.api_key_plain_encrypted)
     try:
-        user.api_key = user.api_key_plain
-        user.api_key_plain = None
-        user.api_key_approved = True
+        result = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.api_key_approved.isnot(True))
+            .values(
+                api_key_encrypted=encrypt_value(api_key),
+                api_key_hmac=api_key_hmac(api_key),
+                api_key_plain_encrypted=None,
+                api_key_approved=True,
+            )
+        )
         db.session.commit()
-        logger.info(f"User {user_id} API key approved and committed to DB")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error approving user {user_id}: {str(e)}")
         return jsonify({"error": "Database error during approval"}), 500
 
-    # Send email to the user confirming the approval
-    try:
-        send_email(
-            to=user.email,
-            subject="Hermes API Access Approved ✅",
-            html_template="approval.html",
-            template_context={
-                "name": user.name, 
-                "api_key": user.api_key, 
-                "hermes_homepage": Config.HERMES_HOMEPAGE
-            }
-        )
-        logger.info(f"Approval email sent to user {user_id} ({user.email})")
-    except Exception as e:
-        logger.error(f"Failed to send approval email to user {user_id}: {str(e)}")
+    if result.rowcount == 0:
+        logger.info(f"User {user_id} already approved")
+        return jsonify({"message": "User already approved"}), 200
+    logger.info(f"User {user_id} API key approved and committed to DB")
+    invalidate_admin_users_cache()
+
+    # Send email to the user confirming the approval (off the request path).
+    # Imported here so the other admin endpoints don't pull in the SMTP/Jinja stack.
+    from app.utils.mailer import send_email
+
+    run_in_background(
+        send_email,
+        to=user.email,
+        subject="Hermes API Access Approved ✅",
+        html_template="approval.html",
+        template_context={
+            "name": user.name, 
+            "api_key": api_key, 
+            "hermes_homepage": Config.HERMES_HOMEPAGE
+        },
+        raise_errors=True,
+        max_retries=3,
+        retry_delay=30
+    )
+    logger.info(f"Approval email queued for user {user_id} ({user.email})")
 
     logger.info(f"User {user_id} approved successfully")
     return jsonify({
         "success": True,
         "user_id": user.id,
-        "api_key": user.api_key,  # show plain once
+        "api_key": api_key,  # show plain once
     })
 
 
@@ -151,6 +280,10 @@ def list_users_admin(user_id=None):
     - When calling `/users`, the response includes all users with their basic info, 
       email bot counts, Hermes default bot usage, and metrics across the system.
     - When calling `/users/<user_id>`, the response returns detailed info for the specified user.
+    - Listings requested with `include_keys=false` are cached for
+      `ADMIN_USERS_CACHE_TIMEOUT` seconds (default 60) and invalidated whenever a
+      user or EmailBot changes. Responses containing decrypted API keys are
+      never cached.
 
     Response (Success - all users):
     -------------------------------
@@ -188,6 +321,38 @@ def list_users_admin(user_id=None):
         }
     }
 
+    Query Parameters (optional, `/users` only):
+    -------------------------------------------
+    - page, per_page: page-number pagination (per_page max 100, default 20).
+    - limit, after: cursor pagination; `limit` is the page size (max 500) and
+      `after` the `next_cursor` value from the previous page.
+    Without any of these, all users are returned (streamed).
+    - include_keys: `false` omits `api_key` / `api_key_plain` from the listings
+      and skips decrypting them (default `true`).
+
+    Response (Success - `?page=2&per_page=20`):
+    -------------------------------------------
+    Status Code: 200
+    {
+        "success": True,
+        "users": [ ... same fields as above ... ],
+        "page": 2,
+        "per_page": 20,
+        "pages": 3,
+        "total": 50,
+        "metrics": { ... same as above ... }
+    }
+
+    Response (Success - `?limit=50&after=<cursor>`):
+    ------------------------------------------------
+    Status Code: 200
+    {
+        "success": True,
+        "users": [ ... same fields as above ... ],
+        "next_cursor": "<user_id>",   # null on the last page
+        "metrics": { ... same as above ... }
+    }
+
     Response (Success - single user):
     ---------------------------------
     Status Code: 200
@@ -228,6 +393,12 @@ def list_users_admin(user_id=None):
     curl -X GET http://localhost:5000/api/v1/admin/users \
         -H "Authorization: Bearer <admin_api_key>"
 
+    # Get users page by page
+    curl -X GET "http://localhost:5000/api/v1/admin/users?page=1&per_page=20" \
+        -H "Authorization: Bearer <admin_api_key>"
+    curl -X GET "http://localhost:5000/api/v1/admin/users?limit=50&after=<next_cursor>" \
+        -H "Authorization: Bearer <admin_api_key>"
+
     # Get single user
     curl -X GET http://localhost:5000/api/v1/admin/users/<user_id> \
         -H "Authorization: Bearer <admin_api_key>"
@@ -236,14 +407,45 @@ def list_users_admin(user_id=None):
     curl -X GET http://localhost:5000/api/v1/admin/users \
         -H "X-STATIC-KEY: <hermes_static_key>"
     """
+    # Decrypting every API key is the costliest part of a listing
+    include_keys = request.args.get("include_keys", "true").lower() not in ("0", "false", "no")
+
+    # Listings without keys are cached for a short TTL and invalidated on
+    # user/bot mutations; decrypted keys never go to the (possibly Redis) cache
+    cacheable = user_id is None and not include_keys
+    cache_key = admin_users_cache_key() if cacheable else None
+    if cacheable:
+        cached_body = cache.get(cache_key)
+        if cached_body is not None:
+            logger.debug("Serving %s from cache", request.full_path)
+            return Response(cached_body, mimetype="application/json")
+    cache_timeout = current_app.config.get("ADMIN_USERS_CACHE_TIMEOUT", 60)
+
+    def cached_jsonify(payload):
+        response = jsonify(payload)
+        if cacheable:
+            cache.set(cache_key, response.get_data(), timeout=cache_timeout)
+        return response
 
     if user_id:
         logger.info(f"Admin requested details for user_id={user_id}")
         try:
-            user = User.query.filter_by(id=user_id).first()
+            # Load bots in one IN query alongside the user (log stats are
+            # aggregated in SQL); any other lazy load raises instead of
+            # quietly querying per row
+            user = (
+                User.query
+                .options(
+                    selectinload(User.email_bots),
+                    raiseload("*"),
+                )
+                .filter_by(id=user_id)
+                .first()
+            )
             if not user:
                 return jsonify({"error": "User not found"}), 404
 
+            stats = User.fetch_profile_stats(user.id)
             user_data = {
                 "id": user.id,
                 "name": user.name,
@@ -253,8 +455,8 @@ def list_users_admin(user_id=None):
                 "api_key": user.api_key,
                 "api_key_plain": user.api_key_plain,
                 "date_joined": user.date_joined_iso,
-                "email_bot_count": user.email_bot_count,
-                "usage_summary": user.usage_summary(),
+                "email_bot_count": stats["email_bot_count"],
+                "usage_summary": stats["usage_summary"],
                 "hermes_default_usage": user.hermes_default_usage,
                 "email_bots": [
                     {"bot_id": bot.id, "bot_username": bot.username}
@@ -267,62 +469,120 @@ def list_users_admin(user_id=None):
             logger.error(f"Error fetching user {user_id}: {str(e)}", exc_info=True)
             return jsonify({"error": "Database error"}), 500
 
+    elif "page" in request.args or "per_page" in request.args:
+        try:
+            page = max(int(request.args.get("page", 1)), 1)
+            per_page = min(max(int(request.args.get("per_page", 20)), 1), USERS_PER_PAGE_MAX)
+        except ValueError:
+            return jsonify({"error": "page and per_page must be integers"}), 400
+        logger.info(f"Admin requested users page {page} (per_page={per_page})")
+
+        try:
+            users = db.session.execute(
+                select(*USER_LIST_COLUMNS)
+                .order_by(User.id)
+                .limit(per_page)
+                .offset((page - 1) * per_page)
+            ).all()
+            user_list = _serialize_user_rows(users, include_keys)
+            metrics = _user_metrics()
+        except Exception as e:
+            logger.error(f"Error fetching users page: {str(e)}", exc_info=True)
+            return jsonify({"error": "Database error"}), 500
+
+        total = metrics["total_users"]
+        return cached_jsonify({
+            "success": True,
+            "users": user_list,
+            "page": page,
+            "per_page": per_page,
+            "pages": -(-total // per_page),
+            "total": total,
+            "metrics": metrics,
+        })
+
+    elif "limit" in request.args or "after" in request.args:
+        try:
+            limit = min(max(int(request.args.get("limit", 50)), 1), USERS_PAGE_MAX_LIMIT)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        after = request.args.get("after")
+        logger.info(f"Admin requested a page of users (limit={limit}, after={after})")
+
+        # Keyset pagination: seek on the primary key instead of OFFSET
+        stmt = select(*USER_LIST_COLUMNS).order_by(User.id).limit(limit)
+        if after:
+            stmt = stmt.where(User.id > after)
+
+        try:
+            users = db.session.execute(stmt).all()
+            user_list = _serialize_user_rows(users, include_keys)
+            metrics = _user_metrics()
+        except Exception as e:
+            logger.error(f"Error fetching users page: {str(e)}", exc_info=True)
+            return jsonify({"error": "Database error"}), 500
+
+        return cached_jsonify({
+            "success": True,
+            "users": user_list,
+            "next_cursor": users[-1].id if len(users) == limit else None,
+            "metrics": metrics,
+        })
+
     else:
         logger.info("Admin requested list of all users")
+        # Project only the needed columns: one query for bots and one
+        # streamed query for users, instead of one query per user for
+        # `email_bots`.
+        users_stmt = (
+            select(*USER_LIST_COLUMNS)
+            .order_by(User.id)
+            .execution_options(yield_per=500)
+        )
+
         try:
-            users = User.query.all()
+            bot_rows = db.session.execute(
+                select(EmailBot.user_id, EmailBot.id, EmailBot.username)
+            ).all()
+            metrics = _user_metrics()
         except Exception as e:
             logger.error(f"Error fetching users: {str(e)}", exc_info=True)
             return jsonify({"error": "Database error"}), 500
 
-        user_list = [
-            {
-                "id": u.id,
-                "name": u.name,
-                "email": u.email,
-                "api_key_approved": u.api_key_approved,
-                "is_admin": u.is_admin,
-                "api_key": u.api_key,
-                "api_key_plain": u.api_key_plain,
-                "date_joined": u.date_joined_iso,
-                "email_bot_count": u.email_bot_count,
-                "email_bots": [
-                    {"bot_id": bot.id, "bot_username": bot.username}
-                    for bot in u.email_bots
-                ],
-            }
-            for u in users
-        ]
-        
-        # ----------------------------
-        # Dynamic Metrics Calculation
-        # ----------------------------
-        total_users = len(users)
-        total_email_bots = sum(u.email_bot_count for u in users)
-        most_email_bots_user = max(users, key=lambda u: u.email_bot_count, default=None)
-        most_hermes_usage_user = max(users, key=lambda u: u.hermes_default_usage, default=None)
-        top_3_hermes_users = sorted(users, key=lambda u: u.hermes_default_usage, reverse=True)[:3]
-
-        metrics = {
-            "total_users": total_users,
-            "total_email_bots": total_email_bots,
-            "user_with_most_email_bots": {
-                "id": most_email_bots_user.id,
-                "name": most_email_bots_user.name,
-                "email_bot_count": most_email_bots_user.email_bot_count
-            } if most_email_bots_user else None,
-            "user_with_highest_hermes_usage": {
-                "id": most_hermes_usage_user.id,
-                "name": most_hermes_usage_user.name,
-                "hermes_default_usage": most_hermes_usage_user.hermes_default_usage
-            } if most_hermes_usage_user else None,
-            "top_3_hermes_default_users": [
-                {"id": u.id, "name": u.name, "hermes_default_usage": u.hermes_default_usage}
-                for u in top_3_hermes_users
-            ]
-        }
-
-        return jsonify({"success": True, "users": user_list, "metrics": metrics})
+        bots_by_user = defaultdict(list)
+        for bot in bot_rows:
+            bots_by_user[bot.user_id].append(
+                {"bot_id": bot.id, "bot_username": bot.username}
+            )
+
+        def generate():
+            """Stream the users array row by row, then the metrics."""
+            dumps = current_app.json.dumps
+            # Chunks are kept for the response cache only while the body is
+            # small; past STREAM_CACHE_MAX_CHARS memory stays bounded to a row.
+            chunks = [] if cacheable else None
+            size = 0
+
+            def emit(chunk):
+                nonlocal chunks, size
+                if chunks is not None:
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size > STREAM_CACHE_MAX_CHARS:
+                        chunks = None
+                return chunk
+
+            yield emit('{"success": true, "users": [')
+            for i, u in enumerate(db.session.execute(users_stmt)):
+                user_data = _serialize_user_row(u, bots_by_user.get(u.id, []), include_keys)
+                yield emit(("," if i else "") + dumps(user_data))
+            yield emit('], "metrics": ' + dumps(metrics) + '}')
+
+            # Only a fully streamed body is cached
+            if chunks is not None:
+                cache.set(cache_key, "".join(chunks), timeout=cache_timeout)
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 @admin_bp.route("/delete-user/<user_id>", methods=["DELETE"])
@@ -345,7 +605,7 @@ def delete_user(user_id):
     Description:
     ------------
     Admins can delete a user account using this endpoint. All associated EmailBots
-    will also be deleted automatically due to cascade behavior in the database.
+    and Logs are deleted by the database (ON DELETE CASCADE) in the same statement.
 
     URL Parameters:
     ---------------
@@ -383,19 +643,22 @@ def delete_user(user_id):
         -H "X-STATIC-KEY: <hermes_static_key>"
     """
     logger.info(f"Admin attempting to delete user {user_id}")
-    user = User.query.get(user_id)
-    if not user:
-        logger.warning(f"User not found for deletion: {user_id}")
-        return jsonify({"error": "User not found"}), 404
-
     try:
-        db.session.delete(user)
+        # EmailBots and Logs are removed by ON DELETE CASCADE in the database
+        result = db.session.execute(delete(User).where(User.id == user_id))
         db.session.commit()
-        logger.info(f"User {user_id} deleted successfully")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error deleting user {user_id}: {str(e)}")
         return jsonify({"error": "Database error during deletion"}), 500
 
+    if result.rowcount == 0:
+        logger.warning(f"User not found for deletion: {user_id}")
+        return jsonify({"error": "User not found"}), 404
+    invalidate_admin_users_cache()
+    invalidate_admin_emails()
+    logger.info(f"User {user_id} deleted successfully")
+
     return jsonify({
         "success": True,
         "message": "User deleted successfully",
@@ -476,26 +739,32 @@ def block_user(user_id):
         -d '{"block": false}'
     """
     logger.info(f"Admin attempting to block/unblock user {user_id}")
-    user = User.query.get(user_id)
-    if not user:
-        logger.warning(f"User not found for block/unblock: {user_id}")
-        return jsonify({"error": "User not found"}), 404
-
-    data = request.json
-    block = data.get("block", True)  # default to block if not provided
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON body"}), 400
+    is_blocked = bool(data.get("block", True))  # default to block if not provided
 
     try:
-        user.is_blocked = bool(block)
+        result = db.session.execute(
+            update(User).where(User.id == user_id).values(is_blocked=is_blocked)
+        )
         db.session.commit()
-        status_msg = "blocked" if user.is_blocked else "unblocked"
-        logger.info(f"User {user_id} successfully {status_msg}")
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error updating block status for user {user_id}: {str(e)}")
         return jsonify({"error": "Database error"}), 500
 
+    if result.rowcount == 0:
+        logger.warning(f"User not found for block/unblock: {user_id}")
+        return jsonify({"error": "User not found"}), 404
+
+    invalidate_admin_users_cache()
+    status_msg = "blocked" if is_blocked else "unblocked"
+    logger.info(f"User {user_id} successfully {status_msg}")
+
     return jsonify({
         "success": True,
         "message": f"User {status_msg} successfully",
         "user_id": user_id,
-        "is_blocked": user.is_blocked
+        "is_blocked": is_blocked
     })
@@ -1,19 +1,66 @@
 import os
-import base64
-import tempfile
+import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from secrets import token_hex
 
-from flask import Blueprint, request, jsonify, current_app
-from app.models import EmailBot
+try:
+    # SIMD base64 codec; same API as the stdlib module
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, update
 from app.extensions import db
+from app.models import User
 from config import Config
-from app.utils.email_message import EmailMessage
+from app.utils.cache import (
+    get_bot_config,
+    get_email_job_status,
+    is_shared_cache,
+    set_email_job_status,
+)
+from app.utils.crypto import decrypt_value
+from app.utils.email_message import Attachment, EmailMessage
+from app.utils.smtp_pool import smtp_pool
 from app.utils.auth import get_current_user, require_api_key, log_request
+from app.utils.tasks import run_in_background
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on messages per /send-emails request (bounds worker occupancy)
+SEND_EMAILS_MAX_BATCH = 100
+
+# A /send-emails batch is spread over up to this many SMTP sessions in parallel
+SEND_EMAILS_MAX_CONNECTIONS = 4
+_batch_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hermes-batch")
+
+# Cheap syntactic check of recipient addresses (no DNS, no full RFC parse)
+_EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$")
+
+DEFAULT_BOT_LIMIT = Config.HERMES_DEFAULT_BOT_LIMIT
+DOCS_URL = f"{Config.HERMES_HOMEPAGE}/docs"
+
+# (sender_email, sender_password, smtp_server, smtp_port) of the default
+# Hermes bot, read from the app config once when the blueprint is registered
+_DEFAULT_BOT = None
+
 email_bp = Blueprint("email_api", __name__, url_prefix="/api/v1")
 
+
+@email_bp.record_once
+def _load_default_bot(state):
+    global _DEFAULT_BOT
+    config = state.app.config
+    _DEFAULT_BOT = (
+        config.get("BOT_EMAIL"),
+        config.get("BOT_PASSWORD"),
+        config.get("BOT_MAIL_SERVER", "smtp.gmail.com"),
+        config.get("BOT_MAIL_PORT", 587),
+    )
+
 @email_bp.route("/send-email", methods=["POST"])
 @require_api_key
 @log_request
@@ -46,7 +93,8 @@ def send_email():
                 "filename": "hello.txt",
                 "content": "SGVsbG8gd29ybGQh"     # base64 for "Hello world!"
             }
-        ]
+        ],
+        "async": true                             # optional, deliver in the background
         # also accepts:
         # - list of file paths ["./path/to/file1.txt", "./path/to/file2.pdf"]
         # - single file path string "./path/to/file.txt"
@@ -55,7 +103,7 @@ def send_email():
     Validation:
     -----------
     - "to" address is validated for:
-        * correct email format (RFC-compliant)
+        * correct email format (a compiled pattern match; no DNS lookup)
     - Invalid or malformed addresses return HTTP 400.
 
     Responses:
@@ -72,6 +120,15 @@ def send_email():
         }
     }
 
+    202 Accepted (with "async": true)
+    {
+        "success": true,
+        "message": "Email queued for delivery",
+        "job_id": "<job_id>"          # poll GET /api/v1/email-status/<job_id>
+    }
+    Default Hermes bot usage is reserved when the email is queued and
+    refunded if the delivery fails.
+
     400 Bad Request
     {
         "success": false,
@@ -82,6 +139,11 @@ def send_email():
         "success": false,
         "error": "Invalid bot ID or bot does not belong to user"
     }
+    or (with "async": true when the server has no CACHE_REDIS_URL)
+    {
+        "success": false,
+        "error": "Asynchronous sending is not enabled on this server ..."
+    }
     or
     {
         "success": false,
@@ -121,148 +183,472 @@ def send_email():
             ]
           }'
     """
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Invalid JSON body"}), 400
     user = get_current_user()
     if not user:
         logger.warning("Send-email failed: User not found")
         return jsonify({"success": False, "error": "User not found"}), 400
 
     logger.info(f"Send-email request started by user_id={user.id}")
+    send_async = bool(data.get("async"))
+    if send_async and not is_shared_cache():
+        # Job status must be readable from whichever worker serves the poll
+        logger.warning(f"Send-email failed for user_id={user.id}: async sends need CACHE_REDIS_URL")
+        return jsonify({
+            "success": False,
+            "error": "Asynchronous sending is not enabled on this server "
+                     "(no shared cache is configured); send without \"async\""
+        }), 400
+
+    recipient_error = _recipient_error(data.get("to"))
+    if recipient_error:
+        logger.warning(f"Send-email failed for user_id={user.id}: {recipient_error}")
+        return jsonify({"success": False, "error": recipient_error}), 400
 
     bot_id = data.get("bot_id")
     if bot_id:
         # --- using user’s own bot ---
-        bot = EmailBot.query.filter_by(id=bot_id, user_id=user.id).first()
-        if not bot:
+        credentials = _bot_credentials(user.id, bot_id)
+        if not credentials:
             logger.warning(f"Send-email failed: Invalid bot_id={bot_id} for user_id={user.id}")
             return jsonify({"success": False, "error": "Invalid bot ID or bot does not belong to user"}), 400
 
-        sender_email = bot.email
-        sender_password = bot.password
-        smtp_server = bot.smtp_server
-        smtp_port = bot.smtp_port
-        logger.info(f"Using user-owned EmailBot (id={bot.id}) for user_id={user.id}")
+        sender_email, sender_password, smtp_server, smtp_port = credentials
+        logger.info(f"Using user-owned EmailBot (id={bot_id}) for user_id={user.id}")
     else:
         # --- using default Hermes bot ---
-        if user.hermes_default_usage >= Config.HERMES_DEFAULT_BOT_LIMIT:
+        # Quota check and charge are one guarded UPDATE, so concurrent
+        # requests (sync or queued) cannot overshoot the limit; a failed
+        # send is refunded. The reservation commits (expiring `user`), so
+        # the usage is read before it.
+        used = (user.hermes_default_usage or 0) + 1
+        if not _reserve_default_bot_usage(user.id):
             logger.warning(
                 f"User {user.id} exceeded Hermes default bot usage "
-                f"(limit={Config.HERMES_DEFAULT_BOT_LIMIT})"
+                f"(limit={DEFAULT_BOT_LIMIT})"
+            )
+            return _quota_exceeded_response()
+        logger.info(f"User {user.id} used Hermes default bot ({used}/{DEFAULT_BOT_LIMIT})")
+
+        sender_email, sender_password, smtp_server, smtp_port = _default_bot_credentials()
+        logger.info(f"Using default Hermes bot for user_id={user.id}")
+
+    try:
+        msg = _build_message(data, sender_email)
+
+        if send_async:
+            job_id = token_hex(16)
+            set_email_job_status(job_id, user.id, "queued")
+            run_in_background(
+                _deliver_email, job_id, user.id, not bot_id,
+                msg, sender_password, smtp_server, smtp_port
             )
+            logger.info(f"Email queued as job {job_id} by user_id={user.id}")
             return jsonify({
-                "success": False,
-                "error": "Default Hermes bot usage limit exceeded. "
-                         "Please create your own EmailBot.",
-                "docs": f"{Config.HERMES_HOMEPAGE}/docs"
-            }), 403
+                "success": True,
+                "message": "Email queued for delivery",
+                "job_id": job_id,
+            }), 202
 
-        user.hermes_default_usage += 1
-        db.session.commit()
-        logger.info(
-            f"User {user.id} used Hermes default bot "
-            f"({user.hermes_default_usage}/{Config.HERMES_DEFAULT_BOT_LIMIT})"
+        # Reuse an authenticated keep-alive session for this sender when possible
+        with smtp_pool.connection(smtp_server, smtp_port, sender_email, sender_password) as conn:
+            msg.send(
+                sender_email_password=sender_password,
+                server_info=(smtp_server, smtp_port),
+                print_success_status=False,
+                smtp_connection=conn
+            )
+        logger.info(f"Email successfully sent to {data['to']} by user_id={user.id}")
+
+        response_data = {"success": True, "message": "Email sent successfully!"}
+
+        # If Hermes default bot was used, include usage info
+        if not bot_id:
+            response_data["hermes_default_usage"] = {
+                "used": used,
+                "remaining": max(DEFAULT_BOT_LIMIT - used, 0),
+                "limit": DEFAULT_BOT_LIMIT,
+                "docs": DOCS_URL
+            }
+
+        return jsonify(response_data), 200
+    
+    except Exception as e:
+        logger.error(f"Email send failed for user_id={user.id}: {str(e)}", exc_info=True)
+        if not bot_id:
+            _refund_default_bot_usage(user.id)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _reserve_default_bot_usage(user_id, count=1):
+    """
+    Charge `count` default-bot sends in one guarded UPDATE.
+    Returns False, charging nothing, if they don't fit in the remaining quota.
+    """
+    result = db.session.execute(
+        update(User)
+        .where(
+            User.id == user_id,
+            func.coalesce(User.hermes_default_usage, 0) + count <= DEFAULT_BOT_LIMIT
         )
+        .values(hermes_default_usage=func.coalesce(User.hermes_default_usage, 0) + count)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount > 0
 
-        sender_email = current_app.config.get("BOT_EMAIL")
-        sender_password = current_app.config.get("BOT_PASSWORD")
-        smtp_server = current_app.config.get("BOT_MAIL_SERVER", "smtp.gmail.com")
-        smtp_port = current_app.config.get("BOT_MAIL_PORT", 587)
-        logger.info(f"Using default Hermes bot for user_id={user.id}")
 
-    # ----------------------
-    # Handle attachments
-    # ----------------------
+def _refund_default_bot_usage(user_id, count=1):
+    """Undo the default-bot charge of sends that failed (compensating UPDATE)"""
+    try:
+        db.session.rollback()
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.hermes_default_usage >= count)
+            .values(hermes_default_usage=User.hermes_default_usage - count)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to refund Hermes default bot usage for user_id={user_id}: {str(e)}")
+
+
+def _recipient_error(to):
+    """Return an error message if `to` is not an address or a non-empty list of addresses"""
+    recipients = [to] if isinstance(to, str) else to
+    if not isinstance(recipients, list) or not recipients:
+        return "'to' must be an email address or a non-empty list of addresses"
+    invalid = [r for r in recipients if not isinstance(r, str) or not _EMAIL_RE.match(r)]
+    if invalid:
+        return f"Invalid email format: {', '.join(map(str, invalid))}"
+    return None
+
+
+def _quota_exceeded_response():
+    return jsonify({
+        "success": False,
+        "error": "Default Hermes bot usage limit exceeded. "
+                 "Please create your own EmailBot.",
+        "docs": DOCS_URL
+    }), 403
+
+
+@lru_cache(maxsize=1024)
+def _decrypt_bot_login(email_encrypted, password_encrypted):
+    """
+    Decrypt an EmailBot's (email, password).
+
+    Keyed by the ciphertexts, so an updated, deleted or re-encrypted bot
+    can never be served stale: `get_bot_config` stays the source of truth.
+    """
+    return decrypt_value(email_encrypted), decrypt_value(password_encrypted)
+
+
+def _bot_credentials(user_id, bot_id):
+    """Return (sender_email, sender_password, smtp_server, smtp_port) of a user's EmailBot, or None"""
+    bot = get_bot_config(user_id, bot_id)
+    if not bot:
+        return None
+    sender_email, sender_password = _decrypt_bot_login(
+        bot["email_encrypted"], bot["password_encrypted"]
+    )
+    return sender_email, sender_password, bot["smtp_server"], bot["smtp_port"]
+
+
+def _default_bot_credentials():
+    """Return (sender_email, sender_password, smtp_server, smtp_port) of the Hermes bot"""
+    return _DEFAULT_BOT
+
+
+def _load_attachments(raw_attachments):
+    """
+    Turn the `attachments` field of a send request into a list for EmailMessage.
+
+    Base64 attachments are handed to EmailMessage as in-memory bytes; nothing
+    is written to disk. File paths are passed through and read exactly once,
+    by EmailMessage itself. Each base64 payload is popped from its dict as it is
+    decoded, so the encoded text can be freed before the next one is read.
+    """
     attachments = []
-    raw_attachments = data.get("attachments", [])
     if isinstance(raw_attachments, str):
         raw_attachments = [raw_attachments]
 
-    if isinstance(raw_attachments, list) and all(isinstance(a, str) for a in raw_attachments):
-        converted = []
-        for path in raw_attachments:
-            try:
-                with open(path, "rb") as f:
-                    content = f.read()
-                converted.append({
-                    "filename": os.path.basename(path),
-                    "content": base64.b64encode(content).decode("utf-8")
-                })
-                logger.debug(f"Attachment {path} converted to base64")
-            except Exception as e:
-                logger.error(f"Failed to read attachment file {path}: {e}")
-                converted.append(path)
-        raw_attachments = converted
-
     for att in raw_attachments:
         if isinstance(att, dict) and "filename" in att and "content" in att:
             try:
-                # Create a temporary directory (unique for this run)
-                temp_dir = tempfile.gettempdir()
-                file_path = os.path.join(temp_dir, att["filename"])
-    
-                # If you want to avoid overwriting existing files
-                counter = 1
-                original_file_path = file_path
-                while os.path.exists(file_path):
-                    file_path = os.path.join(temp_dir, f"{counter}_{att['filename']}")
-                    counter += 1
-    
-                # Write the file
-                with open(file_path, "wb") as f:
-                    f.write(base64.b64decode(att["content"]))
-    
-                attachments.append(file_path)
-                logger.debug(f"Attachment saved to temp file {file_path}")
-    
+                attachments.append(
+                    Attachment(os.path.basename(att["filename"]), _b64.b64decode(att.pop("content")))
+                )
+                logger.debug("Attachment %s decoded", att["filename"])
             except Exception as e:
                 logger.error(f"Failed to decode attachment {att.get('filename')}: {str(e)}")
         else:
             attachments.append(att)
-            logger.debug(f"Attachment added as path: {att}")
+            logger.debug("Attachment added as path: %s", att)
 
-    try:
-        msg = EmailMessage(
-            sender_email_id=sender_email,
-            to=data["to"],
-            subject=data.get("subject"),
-            email_plain_text=data.get("email_plain_text"),
-            email_html_text=data.get("email_html_text"),
-            cc=data.get("cc"),
-            bcc=data.get("bcc"),
-            attachments=attachments,
-            formataddr_text=data.get("from_name"),
-            stdout_print=False
-        )
-        msg.send(
-            sender_email_password=sender_password,
-            server_info=(smtp_server, smtp_port),
-            print_success_status=False
-        )
-        logger.info(f"Email successfully sent to {data['to']} by user_id={user.id}")
+    return attachments
 
-        # Cleanup temp files
-        for f in attachments:
-            if isinstance(f, str) and os.path.exists(f):
-                try:
-                    os.remove(f)
-                    logger.debug(f"Temp file {f} deleted after sending")
-                except Exception as e:
-                    logger.warning(f"Failed to delete temp file {f}: {e}")
 
-        response_data = {"success": True, "message": "Email sent successfully!"}
+def _build_message(data, sender_email):
+    """Build the EmailMessage for one send request (`data` is its JSON body)"""
+    return EmailMessage(
+        sender_email_id=sender_email,
+        to=data["to"],
+        subject=data.get("subject"),
+        email_plain_text=data.get("email_plain_text"),
+        email_html_text=data.get("email_html_text"),
+        cc=data.get("cc"),
+        bcc=data.get("bcc"),
+        attachments=_load_attachments(data.get("attachments", [])),
+        formataddr_text=data.get("from_name"),
+        stdout_print=False
+    )
 
-        # If Hermes default bot was used, include usage info
-        if not bot_id:
-            remaining = Config.HERMES_DEFAULT_BOT_LIMIT - user.hermes_default_usage
-            response_data["hermes_default_usage"] = {
-                "used": user.hermes_default_usage,
-                "remaining": max(remaining, 0),
-                "limit": Config.HERMES_DEFAULT_BOT_LIMIT,
-                "docs": f"{Config.HERMES_HOMEPAGE}/docs"
-            }
 
-        return jsonify(response_data), 200
-    
+def _send_batch_shard(shard, credentials, user_id):
+    """
+    Send the `(index, message)` pairs of `shard` over one pooled SMTP session.
+    Per-message failures are recorded; a failure to connect propagates.
+    """
+    sender_email, sender_password, smtp_server, smtp_port = credentials
+    results = []
+    with smtp_pool.connection(smtp_server, smtp_port, sender_email, sender_password) as conn:
+        for index, message in shard:
+            try:
+                _build_message(message, sender_email).send(
+                    sender_email_password=sender_password,
+                    server_info=(smtp_server, smtp_port),
+                    print_success_status=False,
+                    smtp_connection=conn
+                )
+                results.append({"index": index, "success": True, "error": None})
+            except Exception as e:
+                logger.warning(f"Batch message {index} failed for user_id={user_id}: {str(e)}")
+                results.append({"index": index, "success": False, "error": str(e)})
+    return results
+
+
+def _deliver_email(job_id, user_id, default_bot, msg, sender_password, smtp_server, smtp_port):
+    """
+    Background worker for `"async": true` sends: deliver `msg` and record the
+    job status. A default Hermes bot send was charged when it was queued and is
+    refunded here if the delivery fails.
+    """
+    try:
+        with smtp_pool.connection(smtp_server, smtp_port, msg.sender, sender_password) as conn:
+            msg.send(
+                sender_email_password=sender_password,
+                server_info=(smtp_server, smtp_port),
+                print_success_status=False,
+                smtp_connection=conn
+            )
     except Exception as e:
-        logger.error(f"Email send failed for user_id={user.id}: {str(e)}", exc_info=True)
-        return jsonify({"success": False, "error": str(e)}), 500
+        logger.error(f"Background email job {job_id} failed for user_id={user_id}: {str(e)}")
+        if default_bot:
+            _refund_default_bot_usage(user_id)
+        set_email_job_status(job_id, user_id, "failed", error=str(e))
+        return
+
+    set_email_job_status(job_id, user_id, "sent")
+    logger.info(f"Background email job {job_id} sent for user_id={user_id}")
+
+
+@email_bp.route("/email-status/<job_id>", methods=["GET"])
+@require_api_key
+@log_request
+def email_status(job_id):
+    """
+    Get the delivery status of an email sent with `"async": true`.
+
+    Endpoint:
+    ---------
+    GET /api/v1/email-status/<job_id>
+
+    Responses:
+    ----------
+    200 OK
+    {
+        "success": true,
+        "job_id": "<job_id>",
+        "status": "queued" | "sent" | "failed",
+        "error": null | "<error message>"
+    }
+
+    404 Not Found (unknown, expired, or another user's job)
+    {
+        "success": false,
+        "error": "Job not found"
+    }
+    """
+    user = get_current_user()
+    job = get_email_job_status(job_id)
+    if not user or not job or job["user_id"] != user.id:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status": job["status"],
+        "error": job["error"],
+    })
+
+
+@email_bp.route("/send-emails", methods=["POST"])
+@require_api_key
+@log_request
+def send_emails():
+    """
+    Send a batch of emails from one sender in a single request.
+
+    Authentication and the EmailBot lookup happen once for the whole batch.
+    The messages are spread over up to SEND_EMAILS_MAX_CONNECTIONS pooled SMTP
+    sessions that send in parallel.
+
+    Endpoint:
+    ---------
+    POST /api/v1/send-emails
+
+    Request Body (JSON):
+    --------------------
+    {
+        "bot_id": "<bot_id>",     # optional, use a specific EmailBot for every message
+        "messages": [             # required, 1 to 100 messages
+            {
+                "to": "recipient@example.com",
+                "subject": "Hello",
+                "email_plain_text": "Hello world!",
+                ...                   # same fields as /send-email
+            },
+            ...
+        ]
+    }
+
+    Responses:
+    ----------
+    200 OK
+    {
+        "success": true,          # false if any message failed
+        "sent": 2,
+        "failed": 1,
+        "results": [
+            {"index": 0, "success": true, "error": null},
+            {"index": 1, "success": false, "error": "<error message>"},
+            ...
+        ],
+        "hermes_default_usage": { ... }   # only if default Hermes bot is used
+    }
+
+    400 Bad Request
+    {
+        "success": false,
+        "error": "messages must be a list of 1 to 100 message objects"
+    }
+
+    403 Forbidden
+    {
+        "success": false,
+        "error": "Default Hermes bot usage limit exceeded. Please create your own EmailBot.",
+        "docs": "https://<your-domain>/docs"
+    }
+
+    Notes:
+    ------
+    - Default Hermes bot usage is counted per sent message, and the whole
+      batch must fit in the remaining quota.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Invalid JSON body"}), 400
+    user = get_current_user()
+    if not user:
+        logger.warning("Send-emails failed: User not found")
+        return jsonify({"success": False, "error": "User not found"}), 400
+
+    messages = data.get("messages")
+    if (
+        not isinstance(messages, list)
+        or not 1 <= len(messages) <= SEND_EMAILS_MAX_BATCH
+        or not all(isinstance(m, dict) for m in messages)
+    ):
+        return jsonify({
+            "success": False,
+            "error": f"messages must be a list of 1 to {SEND_EMAILS_MAX_BATCH} message objects"
+        }), 400
+
+    logger.info(f"Send-emails request of {len(messages)} messages started by user_id={user.id}")
+
+    bot_id = data.get("bot_id")
+    if bot_id:
+        credentials = _bot_credentials(user.id, bot_id)
+        if not credentials:
+            logger.warning(f"Send-emails failed: Invalid bot_id={bot_id} for user_id={user.id}")
+            return jsonify({"success": False, "error": "Invalid bot ID or bot does not belong to user"}), 400
+    else:
+        # Reserve the whole batch in one guarded UPDATE; unsent messages are refunded.
+        # The reservation commits (expiring `user`), so the usage is read before it.
+        usage_before = user.hermes_default_usage or 0
+        if not _reserve_default_bot_usage(user.id, len(messages)):
+            logger.warning(
+                f"User {user.id} batch of {len(messages)} would exceed Hermes default bot usage "
+                f"(limit={DEFAULT_BOT_LIMIT})"
+            )
+            return _quota_exceeded_response()
+        credentials = _default_bot_credentials()
+
+    sender_email, sender_password, smtp_server, smtp_port = credentials
+
+    results = [None] * len(messages)
+    pending = []
+    for index, message in enumerate(messages):
+        recipient_error = _recipient_error(message.get("to"))
+        if recipient_error:
+            results[index] = {"index": index, "success": False, "error": recipient_error}
+        else:
+            pending.append((index, message))
+
+    # Deal the messages round-robin over parallel sessions (SMTP is I/O-bound)
+    shard_count = min(SEND_EMAILS_MAX_CONNECTIONS, len(pending))
+    shards = [pending[i::shard_count] for i in range(shard_count)]
+    futures = [
+        _batch_executor.submit(_send_batch_shard, shard, credentials, user.id)
+        for shard in shards
+    ]
+    connect_error = None
+    for shard, future in zip(shards, futures):
+        try:
+            for result in future.result():
+                results[result["index"]] = result
+        except Exception as e:
+            # Connecting or logging in to the SMTP server failed for this session
+            logger.error(f"Send-emails session failed for user_id={user.id}: {str(e)}", exc_info=True)
+            connect_error = str(e)
+            for index, _ in shard:
+                results[index] = {"index": index, "success": False, "error": connect_error}
+
+    sent = sum(1 for r in results if r["success"])
+    if not bot_id and sent < len(messages):
+        _refund_default_bot_usage(user.id, len(messages) - sent)
+    if connect_error and not sent:
+        return jsonify({"success": False, "error": connect_error}), 500
+    logger.info(f"Batch sent {sent}/{len(messages)} emails for user_id={user.id}")
+
+    response_data = {
+        "success": sent == len(messages),
+        "sent": sent,
+        "failed": len(messages) - sent,
+        "results": results,
+    }
+
+    if not bot_id:
+        used = usage_before + sent
+        response_data["hermes_default_usage"] = {
+            "used": used,
+            "remaining": max(DEFAULT_BOT_LIMIT - used, 0),
+            "limit": DEFAULT_BOT_LIMIT,
+            "docs": DOCS_URL
+        }
+
+    return jsonify(response_data), 200
@@ -1,16 +1,36 @@
-import uuid
 import logging
+from secrets import token_hex
 from flask import Blueprint, request, jsonify
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
 from app.extensions import db
 from app.models import User, EmailBot, Log
 from app.utils.auth import get_current_user, require_api_key, log_request
+from app.utils.cache import (
+    get_admin_emails,
+    get_profile_stats,
+    invalidate_admin_users_cache,
+    invalidate_bot_config,
+    invalidate_profile_stats,
+)
 from app.utils.mailer import send_email
+from app.utils.crypto import decrypt_values, encrypt_value
+from app.utils.tasks import run_in_background
 from config import Config
+from scripts.utils import normalize_email, uuid7_hex
 
 logger = logging.getLogger(__name__)
 
 user_bp = Blueprint("user_api", __name__, url_prefix="/api/v1")
 
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+_ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# EmailBot columns a user may change as-is (email/password are encrypted first)
+EMAIL_BOT_UPDATABLE_FIELDS = ("username", "smtp_server", "smtp_port")
+
 
 @user_bp.route("/register", methods=["POST"])
 def register():
@@ -51,59 +71,113 @@ def register():
         "error": "User already exists"
     }
     """
-    data = request.json
-    name, email = data.get("name"), data.get("email")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON body"}), 400
+    name, email = data.get("name"), normalize_email(data.get("email"))
     logger.info(f"Register API called for email: {email}")
 
     if not name or not email:
         logger.warning("Name and email required for registration")
         return jsonify({"error": "Name and email required"}), 400
 
-    existing = User.query.filter_by(email=email).first()
-    if existing:
+    plain_key = token_hex(16)
+    user_id = uuid7_hex()
+    if not _insert_new_user(
+        id=user_id,
+        name=name,
+        email=email,
+        api_key_plain_encrypted=encrypt_value(plain_key),
+    ):
         logger.warning(f"User already exists: {email}")
         return jsonify({"error": "User already exists"}), 400
-
-    plain_key = str(uuid.uuid4().hex)
-    user = User(name=name, email=email, api_key_plain=plain_key)
-    db.session.add(user)
-    db.session.commit()
+    invalidate_admin_users_cache()
 
     logger.info(f"User registered: {email}")
 
-    # Send email to the admin for approval
-    # get all approved admins
-    admin_emails = [
-        admin.email for admin in User.query.filter_by(is_admin=True).all()
-    ]
-
-    if admin_emails:
-        subject = "Hermes - New User Registration Pending Approval"
-        context = {
-            "name": user.name,
-            "email": user.email,
-            "user_id": user.id
-        }
-
-        send_email(
-            to=admin_emails,
-            subject=subject,
-            html_template="new_user_notification.html",
-            template_context=context,
-            from_name="Hermes Bot"
-        )
+    # Notify the admins off the request path (retried if SMTP fails)
+    run_in_background(
+        _notify_admins_of_registration,
+        {"name": name, "email": email, "user_id": user_id},
+        max_retries=5,
+        retry_delay=30,
+        retry_backoff=True
+    )
 
     return jsonify({
         "success": True,
         "message": "You are registered. Please wait for admin approval.",
         "user": {
-            "id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "account_activated": user.api_key_approved
+            "id": user_id,
+            "name": name,
+            "email": email,
+            "account_activated": False
         }
     }), 201
 
+def _insert_new_user(**values):
+    """
+    INSERT a user unless the email is already registered.
+    Returns False for a duplicate email.
+
+    On SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT (email)
+    DO NOTHING; the unique index decides, so there is no check-then-insert race.
+    """
+    dialect_insert = _ON_CONFLICT_INSERTS.get(db.session.get_bind().dialect.name)
+    if dialect_insert is not None:
+        result = db.session.execute(
+            dialect_insert(User).values(**values).on_conflict_do_nothing(index_elements=["email"])
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    if db.session.scalar(select(exists().where(User.email == values["email"]))):
+        return False
+    db.session.execute(insert(User).values(**values))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration of the same email
+        db.session.rollback()
+        return False
+    return True
+
+
+def _notify_admins_of_registration(context):
+    """Background task: ask every admin to approve a new registration"""
+    admin_emails = get_admin_emails()
+    if not admin_emails:
+        return
+
+    send_email(
+        to=admin_emails,
+        subject="Hermes - New User Registration Pending Approval",
+        html_template="new_user_notification.html",
+        template_context=context,
+        from_name="Hermes Bot",
+        raise_errors=True
+    )
+
+
+def _email_bot_field_error(data):
+    """
+    Type-check the EmailBot fields present in a request body.
+    Returns an error message, or None if they are valid.
+    """
+    for field in ("email", "password", "smtp_server"):
+        if field in data and not isinstance(data[field], str):
+            return f"{field} must be a string"
+    if data.get("username") is not None and not isinstance(data["username"], str):
+        return "username must be a string"
+    if "smtp_port" in data:
+        port = data["smtp_port"]
+        if isinstance(port, bool) or not (
+            isinstance(port, int) or (isinstance(port, str) and port.isdigit())
+        ) or not 0 < int(port) < 65536:
+            return "smtp_port must be an integer between 1 and 65535"
+    return None
+
+
 @user_bp.route("/apikey/recover", methods=["POST"])
 def recover_api_key():
     """
@@ -142,8 +216,10 @@ def recover_api_key():
         "error": "User not found"
     }
     """
-    data = request.json
-    email = data.get("email")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON body"}), 400
+    email = normalize_email(data.get("email"))
     logger.info(f"Recover API key called for email: {email}")
 
     if not email:
@@ -156,7 +232,7 @@ def recover_api_key():
         return jsonify({"error": "User not found"}), 400
 
     # Generate new API key
-    new_api_key = str(uuid.uuid4().hex)
+    new_api_key = token_hex(16)
     user.api_key = new_api_key
     db.session.commit()
     logger.info(f"New API key generated for user_id={user.id}, email={email}")
@@ -240,6 +316,7 @@ def get_profile():
 
     hermes_limit = getattr(Config, "HERMES_DEFAULT_BOT_LIMIT", 5)
     hermes_usage = user.hermes_default_usage or 0
+    stats = get_profile_stats(user.id)
 
     return jsonify({
         "success": True,
@@ -249,8 +326,8 @@ def get_profile():
             "email": user.email,
             "api_key_approved": user.api_key_approved,
             "date_joined": user.date_joined_iso,
-            "email_bot_count": user.email_bot_count,
-            "usage": user.usage_summary(),
+            "email_bot_count": stats["email_bot_count"],
+            "usage": stats["usage_summary"],
             "hermes_default_bot": {
                 "usage": hermes_usage,
                 "limit": hermes_limit,
@@ -289,7 +366,7 @@ def rotate_api_key():
     if not user:
         return jsonify({"error": "User not found"}), 400
 
-    new_key = str(uuid.uuid4().hex)
+    new_key = token_hex(16)
     user.api_key = new_key
     db.session.commit()
 
@@ -346,7 +423,9 @@ def add_email_bot():
     if not user:
         return jsonify({"error": "User not found"}), 400
 
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON body"}), 400
     email = data.get("email")
     password = data.get("password")
     username = data.get("username")
@@ -356,6 +435,11 @@ def add_email_bot():
     if not email or not password:
         return jsonify({"error": "Missing email or password"}), 400
 
+    field_error = _email_bot_field_error(data)
+    if field_error:
+        return jsonify({"error": field_error}), 400
+    smtp_port = int(smtp_port)
+
     bot = EmailBot(
         user_id=user.id,
         username=username,
@@ -367,8 +451,10 @@ def add_email_bot():
 
     db.session.add(bot)
     db.session.commit()
+    invalidate_profile_stats(user.id)
+    invalidate_admin_users_cache()
 
-    logging.info(f"EmailBot added: {bot.id} for user: {user.id}")
+    logger.info(f"EmailBot added: {bot.id} for user: {user.id}")
 
     return jsonify({
         "success": True,
@@ -396,6 +482,10 @@ def list_email_bots(bot_id=None):
     --------
     - Authorization: Bearer <User personal API key>
 
+    Query Parameters (listing only):
+    --------------------------------
+    - include_email: `false` omits `email` from each bot, so nothing is decrypted
+
     Description:
     ------------
     Authenticated users can retrieve their EmailBots. If no bot_id is provided, all EmailBots
@@ -458,8 +548,9 @@ def list_email_bots(bot_id=None):
         return jsonify({"error": "User not found"}), 400
     
     if bot_id:
-        bot = EmailBot.query.filter_by(id=bot_id, user_id=user.id).first()
-        if not bot:
+        # Primary-key fast path (identity map first), then the ownership check
+        bot = db.session.get(EmailBot, bot_id, options=[raiseload("*")])
+        if not bot or bot.user_id != user.id:
             return jsonify({"error": "EmailBot not found or not owned by user"}), 404
         bot_data = {
             "bot_id": bot.id,
@@ -471,19 +562,35 @@ def list_email_bots(bot_id=None):
         }
         return jsonify({"success": True, "bot": bot_data})
     else:
-        logging.debug(f"Listing all EmailBots for user: {user.id}") 
-
-        bots = EmailBot.query.filter_by(user_id=user.id).all()
+        logger.debug("Listing all EmailBots for user: %s", user.id)
+        include_email = request.args.get("include_email", "true").lower() not in ("0", "false", "no")
+
+        # Only the listed columns are fetched, as plain rows (no ORM objects)
+        columns = [
+            EmailBot.id,
+            EmailBot.username,
+            EmailBot.smtp_server,
+            EmailBot.smtp_port,
+            EmailBot.date_created,
+        ]
+        if include_email:
+            columns.append(EmailBot.email_encrypted)
+        bots = db.session.execute(
+            select(*columns).where(EmailBot.user_id == user.id)
+        ).all()
         bot_list = [{
             "bot_id": bot.id,
             "username": bot.username,
-            "email": bot.email,  # decrypted automatically
             "smtp_server": bot.smtp_server,
             "smtp_port": bot.smtp_port,
-            "date_created": bot.date_created_iso,
+            "date_created": bot.date_created,  # serialized natively by the orjson provider
         } for bot in bots]
+        if include_email:
+            emails = decrypt_values(bot.email_encrypted for bot in bots)
+            for bot_data, email in zip(bot_list, emails):
+                bot_data["email"] = email
 
-        logging.info(f"Fetched EmailBots for user: {user.id}, count: {len(bot_list)}")
+        logger.info(f"Fetched EmailBots for user: {user.id}, count: {len(bot_list)}")
 
         return jsonify({"success": True, "bots": bot_list})
 
@@ -498,40 +605,55 @@ def update_email_bot(bot_id):
     """
     Update an existing EmailBot of the authenticated user.
     """
-    logger.debug(f"Handling PUT /api/v1/emailbots/{bot_id} request")
+    logger.debug("Handling PUT /api/v1/emailbots/%s request", bot_id)
 
     user = get_current_user()
     if not user:
         logger.warning("Update EmailBot failed: no user found for provided API key")
         return jsonify({"error": "User not found"}), 400
 
-    bot = EmailBot.query.filter_by(id=bot_id, user_id=user.id).first()
-    if not bot:
-        logger.warning(f"Update EmailBot failed: bot_id={bot_id} not found for user_id={user.id}")
-        return jsonify({"error": "Bot not found"}), 400
-
-    data = request.json or {}
-    logger.debug(f"Update payload for bot_id={bot_id}: {data}")
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid JSON body"}), 400
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Update payload for bot_id=%s: %s", bot_id, {
+            k: ("***" if k == "password" else v) for k, v in data.items()
+        })
+
+    field_error = _email_bot_field_error(data)
+    if field_error:
+        return jsonify({"error": field_error}), 400
+    if "smtp_port" in data:
+        data["smtp_port"] = int(data["smtp_port"])
 
-    if "username" in data:
-        bot.username = data["username"]
+    # Plain columns are copied as-is; credentials are encrypted here so the
+    # whole change is one UPDATE without loading the bot
+    updates = {field: data[field] for field in EMAIL_BOT_UPDATABLE_FIELDS if field in data}
     if "email" in data:
-        bot.email = data["email"]  # encrypted automatically
+        updates["email_encrypted"] = encrypt_value(data["email"])
     if "password" in data:
-        bot.password = data["password"]  # encrypted automatically
-    if "smtp_server" in data:
-        bot.smtp_server = data["smtp_server"]
-    if "smtp_port" in data:
-        bot.smtp_port = data["smtp_port"]
+        updates["password_encrypted"] = encrypt_value(data["password"])
 
-    db.session.commit()
+    owned_bot = (EmailBot.id == bot_id) & (EmailBot.user_id == user.id)
+    if updates:
+        result = db.session.execute(update(EmailBot).where(owned_bot).values(**updates))
+        db.session.commit()
+        found = result.rowcount > 0
+    else:
+        found = db.session.scalar(select(exists().where(owned_bot)))
 
-    logger.info(f"EmailBot updated successfully: bot_id={bot.id} for user_id={user.id}, email={user.email}")
+    if not found:
+        logger.warning(f"Update EmailBot failed: bot_id={bot_id} not found for user_id={user.id}")
+        return jsonify({"error": "Bot not found"}), 400
+    invalidate_bot_config(user.id, bot_id)
+    invalidate_admin_users_cache()
+
+    logger.info(f"EmailBot updated successfully: bot_id={bot_id} for user_id={user.id}, email={user.email}")
 
     return jsonify({
         "success": True,
         "message": "EmailBot updated successfully",
-        "bot_id": bot.id
+        "bot_id": bot_id
     }), 200
 
 
@@ -544,29 +666,32 @@ def update_email_bot(bot_id):
 def delete_email_bot(bot_id):
     """
     Delete an EmailBot owned by the authenticated user.
+
+    Returns 204 with an empty body on success, 404 if the bot does not
+    exist or belongs to another user.
     """
-    logger.debug(f"Handling DELETE /api/v1/emailbots/{bot_id} request")
+    logger.debug("Handling DELETE /api/v1/emailbots/%s request", bot_id)
 
     user = get_current_user()
     if not user:
         logger.warning("Delete EmailBot failed: no user found for provided API key")
         return jsonify({"error": "User not found"}), 400
 
-    bot = EmailBot.query.filter_by(id=bot_id, user_id=user.id).first()
-    if not bot:
+    # One DELETE scoped to the owner; no SELECT, no ORM instance
+    result = db.session.execute(
+        delete(EmailBot).where(EmailBot.id == bot_id, EmailBot.user_id == user.id)
+    )
+    db.session.commit()
+    if result.rowcount == 0:
         logger.warning(f"Delete EmailBot failed: bot_id={bot_id} not found for user_id={user.id}")
         return jsonify({"error": "EmailBot not found or not owned by user"}), 404
-
-    db.session.delete(bot)
-    db.session.commit()
+    invalidate_bot_config(user.id, bot_id)
+    invalidate_profile_stats(user.id)
+    invalidate_admin_users_cache()
 
     logger.info(f"EmailBot deleted successfully: bot_id={bot_id} for user_id={user.id}, email={user.email}")
 
-    return jsonify({
-        "success": True,
-        "message": "EmailBot deleted successfully",
-        "bot_id": bot_id
-    }), 200
+    return "", 204
 
 
 # -------------------------
@@ -587,22 +712,18 @@ def get_logs():
         return jsonify({"error": "User not found"}), 400
 
     limit = int(request.args.get("limit", 20))
-    logger.debug(f"Fetching logs for user_id={user.id}, limit={limit}")
+    logger.debug("Fetching logs for user_id=%s, limit=%s", user.id, limit)
 
-    logs = (
-        Log.query.filter_by(user_id=user.id)
+    # Plain rows of the returned columns, read off ix_log_user_ts
+    logs = db.session.execute(
+        select(Log.id, Log.endpoint, Log.method, Log.timestamp, Log.status_code)
+        .where(Log.user_id == user.id)
         .order_by(Log.timestamp.desc())
         .limit(limit)
-        .all()
-    )
+    ).all()
 
-    log_list = [{
-        "id": log.id,
-        "endpoint": log.endpoint,
-        "method": log.method,
-        "timestamp": log.timestamp_iso,
-        "status_code": log.status_code
-    } for log in logs]
+    # Row keys are the response keys; timestamps are serialized natively by orjson
+    log_list = [log._asdict() for log in logs]
 
     logger.info(f"Fetched {len(log_list)} logs for user_id={user.id}, email={user.email}")
 
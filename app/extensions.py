@@ -1,5 +1,30 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from flask_caching import Cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
 migrate = Migrate()
+cache = Cache()
+
+
+@event.listens_for(Engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings:
+    - foreign_keys: SQLite ignores ON DELETE CASCADE unless enabled
+    - WAL journal + synchronous=NORMAL: writers (e.g. the batched request
+      log flush) don't block readers, and commits skip most fsyncs
+    - temp tables/sorts in memory, and up to 256 MiB of the file memory-mapped
+      so large log scans read pages without a syscall each
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
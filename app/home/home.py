@@ -1,23 +1,29 @@
-
 from flask import Blueprint, render_template
 from datetime import datetime
+from app.extensions import cache
 from config import Config
 
 home_bp = Blueprint("home", __name__)
 
+# The example client shown on /docs only changes between deploys
+_email_client_code_path = Config.SCRIPTS_DIR / "send_email_client.py"
+EMAIL_CLIENT_CODE = (
+    _email_client_code_path.read_text()
+    if _email_client_code_path.exists() else "# send_email_client.py not found."
+)
+
 @home_bp.route("/", methods=["GET"])
 def homepage():
     return render_template("homepage.html", year=datetime.now().year)
 
 @home_bp.route("/docs", methods=["GET"])
+@cache.cached(timeout=3600, key_prefix="docs_page")
 def full_docs():
-    email_client_code_path = Config.SCRIPTS_DIR / "send_email_client.py"
-    email_client_code = email_client_code_path.read_text() if email_client_code_path.exists() else "# send_email_client.py not found."
     return render_template(
         "full_docs.html", 
         year=datetime.now().year, 
         hermes_default_bot_limit=Config.HERMES_DEFAULT_BOT_LIMIT,
-        email_client_code=email_client_code,
+        email_client_code=EMAIL_CLIENT_CODE,
         hermes_github_repo=Config.HERMES_GITHUB_REPO,
         hermes_homepage=Config.HERMES_HOMEPAGE
     )
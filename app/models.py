@@ -1,23 +1,28 @@
 # models.py
 
-import uuid
 from datetime import timezone
+from functools import cached_property  # ISO strings of timestamps that are never updated
 from app.extensions import db
-from app.utils.crypto import encrypt_value, decrypt_value
-from scripts.utils import utcnow
+from app.utils.crypto import api_key_hmac, encrypt_value, decrypt_value
+from scripts.utils import utcnow, uuid7_hex
 
 class User(db.Model):
     __tablename__ = "user"
+    __table_args__ = (
+        # Covers the admin email lookup (is_admin filter, email column)
+        db.Index("ix_user_is_admin_email", "is_admin", "email"),
+    )
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4().hex))
+    id = db.Column(db.String, primary_key=True, default=uuid7_hex)
     name = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
 
     api_key_encrypted = db.Column(db.String(256), unique=True, nullable=True)  # encrypted
+    api_key_hmac = db.Column(db.String(64), unique=True, index=True, nullable=True)  # lookup index
     api_key_plain_encrypted = db.Column(db.String(128), nullable=True)  # store plain only until approval
     is_admin = db.Column(db.Boolean, default=False)
     api_key_approved = db.Column(db.Boolean, default=False)
-    hermes_default_usage = db.Column(db.Integer, default=0)
+    hermes_default_usage = db.Column(db.Integer, default=0, index=True)  # admin usage rankings
     is_blocked = db.Column(db.Boolean, default=False, nullable=False)
 
     date_joined = db.Column(db.DateTime(timezone=True), default=utcnow)
@@ -27,13 +32,26 @@ class User(db.Model):
         "EmailBot",
         back_populates="user",
         cascade="all, delete-orphan",
-        lazy=True
+        passive_deletes=True,  # rely on ON DELETE CASCADE in the database
+        # Never lazy-loaded: load it explicitly with selectinload(User.email_bots)
+        # (one IN query for many users); an implicit per-user load raises
+        lazy="raise"
+    )
+
+    # Cascade delete: a user's logs go with them (ON DELETE CASCADE). Usage
+    # stats are aggregated in SQL, so the collection is never lazy-loaded.
+    logs = db.relationship(
+        "Log",
+        back_populates="user",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="raise"
     )
 
     def __repr__(self):
         return f"<User {self.email}>"
     
-    @property
+    @cached_property
     def date_joined_iso(self):
         """
         Return the date_joined in ISO 8601 format with timezone info.
@@ -44,7 +62,10 @@ class User(db.Model):
 
     @property
     def email_bot_count(self):
-        """Return the total number of EmailBots owned by this user"""
+        """
+        Return the total number of EmailBots owned by this user.
+        Requires `email_bots` to be loaded (see `fetch_profile_stats` otherwise).
+        """
         return len(self.email_bots)
     
 
@@ -58,27 +79,38 @@ class User(db.Model):
 
     @api_key.setter
     def api_key(self, value):
-        """Encrypt and store API key"""
+        """Encrypt and store API key (and its HMAC for lookups)"""
         if value:
             self.api_key_encrypted = encrypt_value(value)
+            self.api_key_hmac = api_key_hmac(value)
         else:
             self.api_key_encrypted = None
+            self.api_key_hmac = None
 
     def _set_api_key(self, value, fernet_key):
         """This method is used during key rotation"""
         if value:
             self.api_key_encrypted = encrypt_value(value, key=fernet_key)
+            self.api_key_hmac = api_key_hmac(value)
         else:
             self.api_key_encrypted = None
+            self.api_key_hmac = None
+
+    # --------- Usage stats (aggregated in SQL) ------------
+    def _log_scalar(self, expression, *criteria):
+        """Evaluate an aggregate over this user's logs in the database"""
+        return db.session.scalar(
+            db.select(expression).where(Log.user_id == self.id, *criteria)
+        )
 
     @property
     def total_api_calls(self) -> int:
         """Total API calls made by this user"""
-        return len(self.logs)  # uses backref relationship
+        return self._log_scalar(db.func.count(Log.id))
 
     def count_endpoint_usage(self, endpoint: str) -> int:
         """Count number of calls to a specific endpoint"""
-        return sum(1 for log in self.logs if log.endpoint == endpoint)
+        return self._log_scalar(db.func.count(Log.id), Log.endpoint == endpoint)
 
     @property
     def send_email_usage(self) -> int:
@@ -88,30 +120,53 @@ class User(db.Model):
     @property
     def last_activity(self):
         """Timestamp of the last API call"""
-        if not self.logs:
-            return None
-        return max(log.timestamp for log in self.logs)
+        return self._log_scalar(db.func.max(Log.timestamp))
 
     @property
     def success_rate(self) -> float:
         """Ratio of successful (200) responses"""
-        total = len(self.logs)
-        if total == 0:
-            return 0.0
-        successes = sum(1 for log in self.logs if log.status_code == 200)
-        return successes / total
+        rate = self._log_scalar(db.func.avg(db.case((Log.status_code == 200, 1.0), else_=0.0)))
+        return float(rate) if rate is not None else 0.0
 
     def usage_summary(self) -> dict:
-        """Return a dictionary of all relevant usage stats"""
-        return {
-            "total_api_calls": self.total_api_calls,
-            "send_email_calls": self.send_email_usage,
-            "last_activity": (
-                self.last_activity.astimezone(timezone.utc).isoformat()
-                if self.last_activity else None
-            ),
-            "success_rate": round(self.success_rate, 2),
+        """Return a dictionary of all relevant usage stats (one query)"""
+        return User.fetch_profile_stats(self.id, include_bot_count=False)["usage_summary"]
+
+    @staticmethod
+    def fetch_profile_stats(user_id, include_bot_count=True) -> dict:
+        """
+        Same stats as `usage_summary()` plus `email_bot_count`, computed by
+        one aggregate SELECT instead of loading the user's logs and bots.
+        """
+        columns = [
+            db.func.count(Log.id).label("total"),
+            db.func.count(db.case((Log.endpoint == "/api/v1/send-email", 1))).label("send_email"),
+            db.func.max(Log.timestamp).label("last_activity"),
+            db.func.count(db.case((Log.status_code == 200, 1))).label("successes"),
+        ]
+        if include_bot_count:
+            columns.append(
+                db.select(db.func.count(EmailBot.id))
+                .where(EmailBot.user_id == user_id)
+                .scalar_subquery()
+                .label("email_bot_count")
+            )
+        row = db.session.execute(db.select(*columns).where(Log.user_id == user_id)).one()
+
+        stats = {
+            "usage_summary": {
+                "total_api_calls": row.total,
+                "send_email_calls": row.send_email,
+                "last_activity": (
+                    row.last_activity.astimezone(timezone.utc).isoformat()
+                    if row.last_activity else None
+                ),
+                "success_rate": round(row.successes / row.total, 2) if row.total else 0.0,
+            },
         }
+        if include_bot_count:
+            stats["email_bot_count"] = row.email_bot_count
+        return stats
 
 
     # --------- API Key Plain (Encrypted) ------------
@@ -141,8 +196,10 @@ class User(db.Model):
 class EmailBot(db.Model):
     __tablename__ = "email_bot"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4().hex))
-    user_id = db.Column(db.String, db.ForeignKey("user.id"), nullable=False)
+    id = db.Column(db.String, primary_key=True, default=uuid7_hex)
+    user_id = db.Column(
+        db.String, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     username = db.Column(db.String(50), nullable=True)  # optional bot name
     email_encrypted = db.Column(db.String(256), nullable=False)
     password_encrypted = db.Column(db.String(256), nullable=False)
@@ -157,7 +214,7 @@ class EmailBot(db.Model):
     def __repr__(self):
         return f"<EmailBot {self.username or self.email}>"
     
-    @property
+    @cached_property
     def date_created_iso(self):
         """
         Return the date_created in ISO 8601 format with timezone info.
@@ -198,23 +255,28 @@ class EmailBot(db.Model):
 class Log(db.Model):
     __tablename__ = "log"
 
-    id = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4().hex))
+    id = db.Column(db.String, primary_key=True, default=uuid7_hex)
     user_id = db.Column(db.String, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     endpoint = db.Column(db.String(256), nullable=False)
     method = db.Column(db.String(10), nullable=False)
     status_code = db.Column(db.Integer, nullable=False)
     timestamp = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
 
-    # Relationship to user with cascade delete
-    user = db.relationship(
-        "User",
-        backref=db.backref("logs", lazy=True, cascade="all, delete-orphan")
+    __table_args__ = (
+        # Serves "latest logs of a user" as an index range scan (no sort)
+        db.Index("ix_log_user_ts", "user_id", timestamp.desc()),
+        # Covers the per-user usage aggregates (endpoint / status filters,
+        # MAX(timestamp)) so they are answered from the index alone
+        db.Index("ix_log_user_endpoint_status_ts", "user_id", "endpoint", "status_code", "timestamp"),
     )
 
+    # Relationship to user
+    user = db.relationship("User", back_populates="logs")
+
     def __repr__(self):
         return f"<Log {self.method} {self.endpoint} by {self.user_id} at {self.timestamp}>"
     
-    @property
+    @cached_property
     def timestamp_iso(self):
         """
         Return the timestamp in ISO 8601 format with timezone info.
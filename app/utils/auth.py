@@ -1,18 +1,51 @@
-from flask import request, current_app, jsonify
+from flask import g, request, current_app, jsonify
 from functools import wraps
-from app.models import User, Log
-from app.extensions import db
+from app.models import User
+from app.utils.crypto import api_key_hmac
+from app.utils.log_buffer import log_buffer
+from scripts.utils import utcnow, uuid7_hex
+
+# Issued keys are 32 hex chars; anything far outside this range can't match
+API_KEY_MIN_LENGTH = 16
+API_KEY_MAX_LENGTH = 128
+
+
+def find_user_by_api_key(api_key: str):
+    """
+    Return the User owning `api_key` (approved or not), or None.
+
+    The key is matched through the indexed `api_key_hmac` column, so a
+    lookup is a single equality query with no decryption.
+    The result is memoized on `flask.g`, so `require_api_key` and
+    `get_current_user` share one lookup and the blocked/approved/admin
+    checks read flags from the already-loaded row.
+    Malformed (too short / too long) keys are rejected without a query.
+    """
+    if not API_KEY_MIN_LENGTH <= len(api_key) <= API_KEY_MAX_LENGTH:
+        return None
+    lookups = g.setdefault("api_key_lookups", {})
+    if api_key not in lookups:
+        lookups[api_key] = User.query.filter_by(api_key_hmac=api_key_hmac(api_key)).first()
+    return lookups[api_key]
 
 def get_current_user():
     """
     Returns the User object if the request has a valid personal API key.
     Returns None if invalid.
 
+    The result is memoized on `flask.g`, so the decorators, the view and
+    `log_request` share a single lookup per request.
+
     Checks headers:
     ---------------
     - Authorization: Bearer <user_api_key>
     - X-STATIC-KEY: <Hermes static key> (optional, for trusted apps)
     """
+    if "current_user" not in g:
+        g.current_user = _resolve_current_user()
+    return g.current_user
+
+def _resolve_current_user():
     # Check static key first
     static_key = request.headers.get("X-STATIC-KEY")
     if static_key and static_key == current_app.config.get("API_STATIC_KEY"):
@@ -27,13 +60,9 @@ def get_current_user():
     if not api_key:
         return None
 
-    users = User.query.filter_by(api_key_approved=True).all()
-    for user in users:
-        try:
-            if user.api_key == api_key:  # api_key property decrypts automatically
-                return user
-        except Exception:
-            continue
+    user = find_user_by_api_key(api_key)
+    if user and user.api_key_approved:
+        return user
 
     return None
 
@@ -64,27 +93,23 @@ def require_api_key(f):
         if not key:
             return jsonify({"error": "API key missing"}), 401
 
-        # Look up ALL users (approved and not)
-        users = User.query.all()
-        for user in users:
-            try:
-                if user.api_key == key:
-                    # Check if user is blocked
-                    if user.is_blocked:
-                        return jsonify({"error": "Your account has been blocked. "
-                                                 "Please contact support if this is a mistake."}), 403
-
-                    # Check if API key is approved
-                    if not user.api_key_approved:
-                        return jsonify({
-                            "error": "Your API key is awaiting admin approval. "
-                                     "You’ll receive an email with your API key once approved."
-                        }), 403
-
-                    # Everything is fine, proceed to the route
-                    return f(*args, **kwargs)
-            except Exception:
-                continue
+        # Look up the key among ALL users (approved and not)
+        user = find_user_by_api_key(key)
+        if user:
+            # Check if user is blocked
+            if user.is_blocked:
+                return jsonify({"error": "Your account has been blocked. "
+                                         "Please contact support if this is a mistake."}), 403
+
+            # Check if API key is approved
+            if not user.api_key_approved:
+                return jsonify({
+                    "error": "Your API key is awaiting admin approval. "
+                             "You’ll receive an email with your API key once approved."
+                }), 403
+
+            # Everything is fine, proceed to the route
+            return f(*args, **kwargs)
 
         return jsonify({"error": "Invalid API key"}), 403
 
@@ -98,14 +123,15 @@ def log_request(func):
         try:
             user = get_current_user()
             if user:
-                log_entry = Log(
-                    user_id=user.id,
-                    endpoint=request.path,
-                    method=request.method,
-                    status_code=response[1] if isinstance(response, tuple) else 200
-                )
-                db.session.add(log_entry)
-                db.session.commit()
+                # Written in batches by the log buffer, off the request path
+                log_buffer.append({
+                    "id": uuid7_hex(),
+                    "user_id": user.id,
+                    "endpoint": request.path,
+                    "method": request.method,
+                    "status_code": response[1] if isinstance(response, tuple) else 200,
+                    "timestamp": utcnow(),
+                })
         except Exception as e:
             # don't break API if logging fails
             print(f"Failed to log request: {e}")
@@ -0,0 +1,124 @@
+# app/utils/cache.py
+from flask import current_app, request
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload
+from app.extensions import db, cache
+from app.models import EmailBot, User
+from config import Config
+
+# EmailBot settings change rarely; credentials stay Fernet-encrypted in the cache.
+# Invalidation on update/delete only reaches other workers through a shared
+# (Redis) cache; with the per-process SimpleCache they may use stale settings
+# until the entry expires, so it is kept only briefly.
+EMAIL_BOT_CACHE_TIMEOUT = 300 if Config.CACHE_REDIS_URL else 5
+
+# The admin set changes rarely; stale entries only affect who gets notified
+ADMIN_EMAILS_CACHE_TIMEOUT = 300
+
+# Log-derived /me stats may lag this much; bot counts are invalidated on change
+PROFILE_STATS_CACHE_TIMEOUT = 60
+
+# How long the status of a background /send-email job can be polled
+EMAIL_JOB_TIMEOUT = 3600
+
+# Bumping the version orphans every cached /admin/users* response at once
+ADMIN_USERS_VERSION_KEY = "admin_users:version"
+
+
+def is_shared_cache():
+    """
+    True when the cache is shared by every worker process (Redis).
+    The default SimpleCache lives in one process, so an entry set by one
+    gunicorn worker is invisible to the others.
+    """
+    return current_app.config.get("CACHE_TYPE") == "RedisCache"
+
+
+def admin_users_cache_key():
+    """Cache key for the current /admin/users* request (path + query string)"""
+    version = cache.get(ADMIN_USERS_VERSION_KEY) or 0
+    return f"admin_users:{version}:{request.full_path}"
+
+
+def invalidate_admin_users_cache():
+    """Invalidate all cached admin user listings"""
+    version = cache.get(ADMIN_USERS_VERSION_KEY) or 0
+    cache.set(ADMIN_USERS_VERSION_KEY, version + 1, timeout=0)
+
+
+@cache.memoize(timeout=EMAIL_BOT_CACHE_TIMEOUT)
+def get_bot_config(user_id, bot_id):
+    """
+    Return the sending settings of `bot_id` if it belongs to `user_id`, else None.
+
+    The result is a dict with `id`, `email_encrypted`, `password_encrypted`,
+    `smtp_server` and `smtp_port`; decrypt the credentials with
+    `app.utils.crypto.decrypt_value` when needed.
+    """
+    bot = (
+        EmailBot.query
+        .options(raiseload("*"))
+        .filter_by(id=bot_id, user_id=user_id)
+        .first()
+    )
+    if not bot:
+        return None
+    return {
+        "id": bot.id,
+        "email_encrypted": bot.email_encrypted,
+        "password_encrypted": bot.password_encrypted,
+        "smtp_server": bot.smtp_server,
+        "smtp_port": bot.smtp_port,
+    }
+
+
+def invalidate_bot_config(user_id, bot_id):
+    """Drop the cached settings of an EmailBot after it is updated or deleted"""
+    cache.delete_memoized(get_bot_config, user_id, bot_id)
+
+
+def invalidate_all_bot_configs():
+    """Drop every cached EmailBot's settings (e.g. after a key rotation)"""
+    cache.delete_memoized(get_bot_config)
+
+
+@cache.memoize(timeout=PROFILE_STATS_CACHE_TIMEOUT)
+def get_profile_stats(user_id):
+    """Return `User.fetch_profile_stats(user_id)` (usage summary and bot count)"""
+    return User.fetch_profile_stats(user_id)
+
+
+def invalidate_profile_stats(user_id):
+    """Drop the cached profile stats after an EmailBot is added or deleted"""
+    cache.delete_memoized(get_profile_stats, user_id)
+
+
+def set_email_job_status(job_id, user_id, status, error=None):
+    """
+    Record the status (`queued`, `sent` or `failed`) of a background email job.
+    Only meaningful with a shared cache (see `is_shared_cache`), since the
+    status may be polled from any worker.
+    """
+    cache.set(
+        f"email_job:{job_id}",
+        {"user_id": user_id, "status": status, "error": error},
+        timeout=EMAIL_JOB_TIMEOUT
+    )
+
+
+def get_email_job_status(job_id):
+    """Return the recorded status dict of a background email job, or None"""
+    return cache.get(f"email_job:{job_id}")
+
+
+@cache.memoize(timeout=ADMIN_EMAILS_CACHE_TIMEOUT)
+def get_admin_emails():
+    """Return the email addresses of all admins"""
+    return db.session.scalars(
+        select(User.email).where(User.is_admin.is_(True))
+    ).all()
+
+
+def invalidate_admin_emails():
+    """Drop the cached admin emails after an admin is added, changed or removed"""
+    cache.delete_memoized(get_admin_emails)
@@ -1,25 +1,69 @@
 # app/utils/crypto.py
-from cryptography.fernet import Fernet
+import hashlib
+import hmac
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet
 from config import Config
 
 FERNET_KEY = Config.FERNET_KEY
+API_KEY_HASH_SECRET = (Config.API_KEY_HASH_SECRET or "").encode()
 
-# Default cipher object
-cipher = Fernet(FERNET_KEY.encode())
+# Default cipher object: encrypts with FERNET_KEY and also decrypts tokens
+# written under OLD_FERNET_KEYS, so a rotation never blocks reads
+cipher = MultiFernet([
+    Fernet(FERNET_KEY.encode()),
+    *(Fernet(key.encode()) for key in Config.OLD_FERNET_KEYS),
+])
 
-def encrypt_value(value: str, key: str = None):
+
+@lru_cache(maxsize=32)
+def _cipher_for(key):
+    """Fernet for an explicit key (str or bytes, e.g. during rotation), built once per key"""
+    return Fernet(key if isinstance(key, bytes) else key.encode())
+
+def encrypt_value(value: str, key=None):
     """
     Encrypt a string using Fernet.
     If no key is provided, use the global cipher.
     """
-    fernet = Fernet(key.encode()) if key else cipher
+    fernet = _cipher_for(key) if key else cipher
     return fernet.encrypt(value.encode()).decode()
 
 
-def decrypt_value(token: str, key: str = None):
+def decrypt_value(token: str, key=None):
     """
     Decrypt a string using Fernet.
     If no key is provided, use the global cipher.
     """
-    fernet = Fernet(key.encode()) if key else cipher
+    fernet = _cipher_for(key) if key else cipher
     return fernet.decrypt(token.encode()).decode()
+
+
+def decrypt_values(tokens, key=None):
+    """
+    Decrypt many Fernet tokens with one cipher (None tokens stay None).
+    If no key is provided, use the global cipher.
+    """
+    fernet = _cipher_for(key) if key else cipher
+    decrypt = fernet.decrypt
+    return [decrypt(token.encode()).decode() if token else None for token in tokens]
+
+
+def reencrypt(token: str, old_cipher, new_cipher):
+    """
+    Re-encrypt a Fernet token from `old_cipher` to `new_cipher` (key rotation);
+    either may be a Fernet or a MultiFernet.
+    The plaintext stays bytes; nothing is decoded to str in between.
+    """
+    return new_cipher.encrypt(old_cipher.decrypt(token.encode())).decode()
+
+
+def api_key_hmac(api_key: str):
+    """
+    Keyed HMAC-SHA256 of an API key (hex), used as its lookup index.
+    Unlike the Fernet ciphertext it is deterministic, so it can be
+    matched with a plain equality query.
+    """
+    if not API_KEY_HASH_SECRET:
+        raise RuntimeError("API_KEY_HASH_SECRET is not set")
+    return hmac.new(API_KEY_HASH_SECRET, api_key.encode(), hashlib.sha256).hexdigest()
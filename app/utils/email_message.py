@@ -17,9 +17,21 @@ from email.mime.base import MIMEBase
 from email.mime.image import MIMEImage
 from email.mime.application import MIMEApplication
 from email import encoders
+from collections import namedtuple
+from functools import lru_cache
 import mimetypes
 
 
+# An in-memory attachment: `data` is the raw (decoded) file content
+Attachment = namedtuple("Attachment", ["filename", "data"])
+
+
+@lru_cache(maxsize=256)
+def _from_header(display_name, sender):
+    """The formatted `From` header; identical for every message of a sender"""
+    return formataddr((display_name, sender))
+
+
 class EmailMessage(MIMEMultipart):
     """
     A class representing an email message
@@ -37,7 +49,7 @@ class EmailMessage(MIMEMultipart):
         `email_html_text` : `str`; (If you want to add some html text use this)
         `cc`: `str` / [`str`, `str`, ..., `str`]; (Carbon Copy)
         `bcc`: `str` / [`str`, `str`, ..., `str`]; (Blind Carbon Copy)
-        `attachments` : `str` / [`str`, `str`, ..., `str`]; (Attachments)
+        `attachments` : `str` / `Attachment` / [...]; (File paths or in-memory `Attachment`s)
         `sdtdout_print` : `bool`; (If True, prints attachment type info to stdout)
 
     Returns:
@@ -62,7 +74,7 @@ class EmailMessage(MIMEMultipart):
         cc = [] if cc is None else cc
         bcc = [] if bcc is None else bcc
         attachments = [] if attachments is None else attachments
-        attachments = [attachments] if isinstance(attachments, str) else attachments
+        attachments = [attachments] if isinstance(attachments, (str, Attachment)) else attachments
 
         if not isinstance(cc, list):
             cc = [cc]
@@ -84,7 +96,7 @@ class EmailMessage(MIMEMultipart):
         MIMEMultipart.__init__(self)
 
         # Structure email
-        self['From'] = formataddr((formataddr_text, self.sender))   
+        self['From'] = _from_header(formataddr_text, self.sender)
         self['To'] = COMMASPACE.join(self.to)
         self['Cc'] = COMMASPACE.join(self.cc) if cc != [] else ''
         self['Bcc'] = COMMASPACE.join(self.bcc) if bcc != [] else ''
@@ -101,13 +113,25 @@ class EmailMessage(MIMEMultipart):
         self.add_attachments()
         
     
+    @staticmethod
+    def _read_attachment(source, mode='rb'):
+        """Return the content of a file path or an in-memory `Attachment`"""
+        if isinstance(source, Attachment):
+            return source.data.decode() if mode == 'r' else source.data
+        with open(source, mode) as temp:
+            return temp.read()
+
     def add_attachments(self):
         
         for attached_file in self.attachments:
 
-            attached_file = Path(attached_file)
+            if isinstance(attached_file, Attachment):
+                filename = attached_file.filename
+            else:
+                attached_file = Path(attached_file)
+                filename = attached_file.name
 
-            my_mimetype, encoding = mimetypes.guess_type(attached_file)
+            my_mimetype, encoding = mimetypes.guess_type(filename)
 
             if my_mimetype is None or encoding is not None:
                 my_mimetype = 'application/octet-stream' 
@@ -119,44 +143,34 @@ class EmailMessage(MIMEMultipart):
             if main_type == 'text':
                 if self.stdout_print:
                     print("text attached")
-                temp = open(attached_file, 'r')  # 'rb' will send this error: 'bytes' object has no attribute 'encode'
-                attachment = MIMEText(temp.read(), _subtype=sub_type)
-                temp.close()
+                # 'rb' will send this error: 'bytes' object has no attribute 'encode'
+                attachment = MIMEText(self._read_attachment(attached_file, 'r'), _subtype=sub_type)
 
             elif main_type == 'image':
                 if self.stdout_print:
                     print("image attached")
-                temp = open(attached_file, 'rb')
-                attachment = MIMEImage(temp.read(), _subtype=sub_type)
-                temp.close()
+                attachment = MIMEImage(self._read_attachment(attached_file), _subtype=sub_type)
 
             elif main_type == 'audio':
                 if self.stdout_print:
                     print("audio attached")
-                temp = open(attached_file, 'rb')
-                attachment = MIMEAudio(temp.read(), _subtype=sub_type)
-                temp.close()            
+                attachment = MIMEAudio(self._read_attachment(attached_file), _subtype=sub_type)
 
             elif main_type == 'application' and sub_type == 'pdf': 
                 if self.stdout_print:
                     print("pdf attached")  
-                temp = open(attached_file, 'rb')
-                attachment = MIMEApplication(temp.read(), _subtype=sub_type)
-                temp.close()
+                attachment = MIMEApplication(self._read_attachment(attached_file), _subtype=sub_type)
 
             else:                              
                 attachment = MIMEBase(main_type, sub_type)
-                temp = open(attached_file, 'rb')
-                attachment.set_payload(temp.read())
+                attachment.set_payload(self._read_attachment(attached_file))
                 encoders.encode_base64(attachment)
-                temp.close()
 
-            filename = attached_file.name
             attachment.add_header('Content-Disposition', 'attachment', filename=filename) # name preview in email
             self.attach(attachment)
 
 
-    def send(self, sender_email_password, server_info=None, print_success_status=True):
+    def send(self, sender_email_password, server_info=None, print_success_status=True, smtp_connection=None):
         """
         Send the composed email message via SMTP.
 
@@ -168,6 +182,9 @@ class EmailMessage(MIMEMultipart):
             Tuple containing the SMTP server address and port, e.g., ("smtp.gmail.com", 587).
         print_success_status : bool, optional
             If True, prints a success message after sending the email (default: True).
+        smtp_connection : smtplib.SMTP, optional
+            An already authenticated SMTP session (e.g. from a connection pool).
+            If given, the message is sent over it and the session is left open.
 
         Returns:
         --------
@@ -178,6 +195,16 @@ class EmailMessage(MIMEMultipart):
         smtplib.SMTPException
             If there is an error during the SMTP session, authentication, or sending.
         """
+        # One DATA for every To/Cc/Bcc address; duplicates are sent only once
+        recipients = list(dict.fromkeys(self.recipients))
+        message = self.as_bytes()
+
+        if smtp_connection is not None:
+            smtp_connection.sendmail(self.sender, recipients, message)
+            if print_success_status:
+                print("\n\t The email has been sent successfully.\n")
+            return
+
         # creates SMTP session
         server_name, server_port = server_info
 
@@ -191,7 +218,7 @@ class EmailMessage(MIMEMultipart):
 
 
         # sending the mail
-        server.sendmail(self.sender, self.recipients, self.as_string())
+        server.sendmail(self.sender, recipients, message)
 
         if print_success_status:
             print("\n\t The email has been sent successfully.\n")
@@ -0,0 +1,39 @@
+# app/utils/json_provider.py
+import decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(o):
+    """Serialize the few types orjson doesn't handle natively"""
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Used by `jsonify`, `request.get_json` and `current_app.json`.
+    datetime, date, UUID and dataclasses are serialized natively
+    (datetimes as RFC 3339 strings).
+    """
+
+    option = orjson.OPT_NAIVE_UTC
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option),
+            mimetype="application/json"
+        )
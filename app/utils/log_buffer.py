@@ -0,0 +1,98 @@
+# app/utils/log_buffer.py
+import atexit
+import logging
+import os
+import threading
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+class LogBuffer:
+    """
+    Buffers API activity `Log` rows and writes them in multi-row INSERTs.
+
+    `log_request` only appends a dict; a daemon thread flushes the buffer
+    every `flush_interval` seconds, or as soon as `max_batch` rows are
+    waiting, with a single INSERT + COMMIT. Whatever is left is flushed
+    on interpreter exit.
+
+    Usage:
+    ------
+        log_buffer.init_app(app)
+        log_buffer.append({"id": ..., "user_id": ..., "endpoint": ..., ...})
+    """
+
+    def __init__(self, flush_interval=0.2, max_batch=500):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._app = None
+        self._rows = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def append(self, row):
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_batch
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork(), so (re)start once per worker process
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="hermes-log-flush", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush request logs: {e}", exc_info=True)
+
+    def flush(self):
+        """Write every buffered row with one INSERT"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows or self._app is None:
+            return
+
+        from app.extensions import db
+        from app.models import Log, User
+
+        with self._app.app_context():
+            try:
+                db.session.execute(insert(Log), rows)
+                db.session.commit()
+            except IntegrityError:
+                # A user was deleted while their rows were buffered; keep the rest
+                db.session.rollback()
+                user_ids = {row["user_id"] for row in rows}
+                existing = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+                rows = [row for row in rows if row["user_id"] in existing]
+                if rows:
+                    db.session.execute(insert(Log), rows)
+                    db.session.commit()
+            finally:
+                db.session.remove()
+
+
+# Process-wide buffer; pending rows are written on interpreter exit
+log_buffer = LogBuffer()
+atexit.register(log_buffer.flush)
@@ -1,6 +1,8 @@
 # app/utils/mailer.py
 from app.utils.email_message import EmailMessage
-from flask import render_template
+from app.utils.smtp_pool import smtp_pool
+from flask import current_app, render_template
+from jinja2 import Template
 from typing import List, Optional, Union
 from config import Config
 
@@ -12,7 +14,7 @@ SMTP_PORT = Config.BOT_MAIL_PORT
 def send_email(
     to: Union[str, List[str]],
     subject: str,
-    html_template: str = None,
+    html_template: Union[str, Template] = None,
     template_context: dict = None,
     plain_text: str = None,
     cc: Optional[List[str]] = None,
@@ -22,7 +24,8 @@ def send_email(
     sender_password: str = BOT_PASSWORD,
     smtp_server: str = SMTP_SERVER,
     smtp_port: int = SMTP_PORT,
-    from_name: str = "Hermes Bot"
+    from_name: str = "Hermes Bot",
+    raise_errors: bool = False
 ):
     """
     Send an email with HTML and/or plain text content.
@@ -31,7 +34,7 @@ def send_email(
     -----------
     - to: recipient email address or list of emails
     - subject: subject of the email
-    - html_template: name of Jinja2 HTML template (optional)
+    - html_template: name of a Jinja2 HTML template, or a loaded `Template` (optional)
     - template_context: dict to render the template (optional)
     - plain_text: fallback plain text body (optional)
     - cc: list of CC email addresses (optional)
@@ -42,6 +45,8 @@ def send_email(
     - smtp_server: SMTP server (default: Gmail)
     - smtp_port: SMTP port (default: 587)
     - sender_name: display name for sender
+    - raise_errors: re-raise failures instead of returning False (used by
+      background tasks so they can retry)
 
     Returns:
     --------
@@ -51,6 +56,13 @@ def send_email(
         # Render HTML template if provided
         html_body = None
         if html_template and template_context is not None:
+            if isinstance(html_template, str):
+                # Use the copy precompiled by create_app() when there is one
+                html_template = current_app.extensions.get(
+                    "hermes_templates", {}
+                ).get(html_template, html_template)
+            # render_template accepts a Template too, and still applies the
+            # context processors, `config`/`url_for` globals and template signals
             html_body = render_template(html_template, **template_context)
 
         msg = EmailMessage(
@@ -65,14 +77,18 @@ def send_email(
             formataddr_text=from_name
         )
 
-        msg.send(
-            sender_email_password=sender_password,
-            server_info=(smtp_server, smtp_port),
-            print_success_status=False
-        )
+        with smtp_pool.connection(smtp_server, smtp_port, sender_email, sender_password) as conn:
+            msg.send(
+                sender_email_password=sender_password,
+                server_info=(smtp_server, smtp_port),
+                print_success_status=False,
+                smtp_connection=conn
+            )
 
         return True
 
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ Failed to send email: {e}")
         return False
@@ -0,0 +1,115 @@
+# app/utils/smtp_pool.py
+import atexit
+import hashlib
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SMTPPool:
+    """
+    A pool of authenticated, keep-alive SMTP sessions.
+
+    Sessions are keyed by (server, port, sender, sha256(password)) so a session
+    is only ever reused by a caller holding the same credentials. Idle sessions
+    are checked with NOOP before reuse and dropped after `idle_timeout` seconds
+    (expired sessions of every key are swept whenever a session is returned).
+
+    Usage:
+    ------
+        with smtp_pool.connection("smtp.gmail.com", 587, sender, password) as conn:
+            conn.sendmail(sender, recipients, message)
+    """
+
+    def __init__(self, idle_timeout=60, max_idle_per_key=2, timeout=30):
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self.timeout = timeout
+        self._idle = {}  # key -> [(smtplib.SMTP, last_used), ...]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(server, port, sender, password):
+        return (server, int(port), sender, hashlib.sha256(password.encode()).hexdigest())
+
+    def _connect(self, server, port, sender, password):
+        conn = smtplib.SMTP(server, port, timeout=self.timeout)
+        conn.starttls()
+        conn.login(sender, password)
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def _checkout(self, key):
+        """Pop a live idle session for `key`, discarding expired/dead ones"""
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    return None
+                conn, last_used = sessions.pop()
+
+            if time.monotonic() - last_used > self.idle_timeout:
+                self._close(conn)
+                continue
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except smtplib.SMTPException:
+                pass
+            self._close(conn)
+
+    def _checkin(self, key, conn):
+        self.prune()
+        with self._lock:
+            sessions = self._idle.setdefault(key, [])
+            if len(sessions) < self.max_idle_per_key:
+                sessions.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def prune(self):
+        """Close idle sessions older than `idle_timeout`, for every key"""
+        deadline = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            for key in list(self._idle):
+                sessions = self._idle[key]
+                expired.extend(conn for conn, last_used in sessions if last_used < deadline)
+                sessions[:] = [(c, t) for c, t in sessions if t >= deadline]
+                if not sessions:
+                    del self._idle[key]
+        for conn in expired:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self, server, port, sender, password):
+        """Check out an authenticated session; it is returned to the pool on success"""
+        key = self._key(server, port, sender, password)
+        conn = self._checkout(key) or self._connect(server, port, sender, password)
+        try:
+            yield conn
+        except Exception:
+            self._close(conn)
+            raise
+        else:
+            self._checkin(key, conn)
+
+    def close_all(self):
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for sessions in idle.values():
+            for conn, _ in sessions:
+                self._close(conn)
+
+
+# Process-wide pool; idle sessions are QUIT cleanly on interpreter exit
+smtp_pool = SMTPPool()
+atexit.register(smtp_pool.close_all)
@@ -0,0 +1,49 @@
+# app/utils/tasks.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Shared worker pool for work that should not block the HTTP response
+# (e.g. SMTP delivery). Threads cooperate under gevent workers as well.
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hermes-task")
+
+
+def run_in_background(func, *args, max_retries=0, retry_delay=30, retry_backoff=False, **kwargs):
+    """
+    Run `func(*args, **kwargs)` on the background executor.
+
+    The current Flask app is captured so the task runs inside an app context
+    (needed for `render_template`, `db.session`, config lookups, ...).
+    If `func` raises, it is retried up to `max_retries` times, `retry_delay`
+    seconds apart (without holding a worker thread while waiting). With
+    `retry_backoff`, the delay doubles after every failed attempt.
+    Exceptions are logged, never propagated to the request.
+
+    Returns:
+    --------
+    - concurrent.futures.Future for the first attempt
+    """
+    app = current_app._get_current_object()
+
+    def task(attempt=0):
+        with app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt < max_retries:
+                    delay = retry_delay * 2 ** attempt if retry_backoff else retry_delay
+                    logger.warning(
+                        f"Background task {func.__name__} failed "
+                        f"(attempt {attempt + 1}/{max_retries + 1}): {e}; "
+                        f"retrying in {delay}s"
+                    )
+                    timer = threading.Timer(delay, executor.submit, args=(task, attempt + 1))
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    logger.error(f"Background task {func.__name__} failed: {e}", exc_info=True)
+
+    return executor.submit(task)
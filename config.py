@@ -15,16 +15,47 @@ class Config:
     LOG_DIR = BASE_DIR / "logs"
     LOG_FILE = LOG_DIR / 'hermes.log'
     SCRIPTS_DIR = BASE_DIR / "scripts"
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR")  # defaults to Jinja's private per-user dir
 
     SQLALCHEMY_DATABASE_URI = "sqlite:///hermes.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Per worker process. With gevent workers many requests share one process,
+    # so keep pool_size + max_overflow at or above the expected in-flight DB
+    # work per worker; LIFO keeps the warm connections in use.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE") or 20),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or 10),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_use_lifo": True,
+    }
+    if SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        # Wait up to 30s for the write lock instead of failing with "database is locked"
+        SQLALCHEMY_ENGINE_OPTIONS["connect_args"] = {"timeout": 30}
+
+    # Reject request bodies (mostly base64 attachments) larger than this with 413
+    # before they are read and parsed
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH") or 32 * 1024 * 1024)
+
+    # Response cache (Redis if CACHE_REDIS_URL is set, else in-process).
+    # `"async": true` sends need Redis: their job status is polled from any worker.
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+    CACHE_TYPE = "RedisCache" if CACHE_REDIS_URL else "SimpleCache"
+    CACHE_DEFAULT_TIMEOUT = 60
+    ADMIN_USERS_CACHE_TIMEOUT = int(os.getenv("ADMIN_USERS_CACHE_TIMEOUT") or 60)
     
     API_STATIC_KEY = os.getenv("API_STATIC_KEY") or "e387faae9cf0478eb6e9dc1b4912e89e"
     FERNET_KEY = os.getenv("FERNET_KEY") or "UvrPTrfAkO_bmmADbon0yV-8dVhi3bhOLvqXllsbr-Q="
+    # Comma-separated keys from previous rotations: still accepted for decryption
+    # until every row has been re-encrypted with FERNET_KEY
+    OLD_FERNET_KEYS = [k.strip() for k in (os.getenv("OLD_FERNET_KEYS") or "").split(",") if k.strip()]
+    # Keys the api_key_hmac lookup index. Required (create_app refuses to start
+    # without it); after changing it run `python -m scripts.cli rehash-api-keys`.
+    API_KEY_HASH_SECRET = os.getenv("API_KEY_HASH_SECRET")
 
     HERMES_GITHUB_REPO = "https://github.com/indrajit912/Hermes.git"
     HERMES_HOMEPAGE = "https://hermesbot.pythonanywhere.com"
-    HERMES_DEFAULT_BOT_LIMIT = os.getenv("HERMES_DEFAULT_BOT_LIMIT") or 10
+    HERMES_DEFAULT_BOT_LIMIT = int(os.getenv("HERMES_DEFAULT_BOT_LIMIT") or 10)
 
     # Email Bot Credentials
     BOT_EMAIL = os.getenv("BOT_EMAIL") or "default@gmail.com"
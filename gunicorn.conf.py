@@ -0,0 +1,41 @@
+# Hermes - gunicorn.conf.py
+# Author: Indrajit Ghosh
+# Created On: Sep 20, 2025
+#
+# Usage:
+#   gunicorn run:app
+#
+# The Hermes endpoints spend most of their time waiting on the database and
+# on SMTP servers. Cooperative gevent workers let a single process keep many
+# such requests in flight instead of blocking one thread per request.
+
+import os
+import multiprocessing
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS") or "gevent"
+
+# Patch the stdlib before the app (and with it SQLAlchemy, smtplib, ...) is
+# imported, so preloading doesn't leave blocking sockets/locks behind
+if worker_class == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.getenv("GUNICORN_BIND") or "0.0.0.0:8080"
+
+workers = int(os.getenv("GUNICORN_WORKERS") or multiprocessing.cpu_count() * 2 + 1)
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS") or 1000)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 60)
+
+# Import the app once in the master; workers share the loaded code, compiled
+# templates and Fernet ciphers copy-on-write and boot faster
+preload_app = (os.getenv("GUNICORN_PRELOAD") or "true").lower() not in ("0", "false", "no")
+
+
+def post_fork(server, worker):
+    # Never share pooled DB connections opened in the master across workers
+    if preload_app:
+        from run import app
+        from app.extensions import db
+        with app.app_context():
+            db.engine.dispose(close=False)
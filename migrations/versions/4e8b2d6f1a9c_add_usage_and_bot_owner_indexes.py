@@ -0,0 +1,32 @@
+"""Index user.hermes_default_usage and email_bot.user_id
+
+Revision ID: 4e8b2d6f1a9c
+Revises: 7c3f9a1e5b2d
+Create Date: 2025-10-04 09:15:22.418306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8b2d6f1a9c'
+down_revision = '7c3f9a1e5b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_hermes_default_usage'), ['hermes_default_usage'], unique=False)
+
+    with op.batch_alter_table('email_bot', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_email_bot_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('email_bot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_bot_user_id'))
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_hermes_default_usage'))
@@ -0,0 +1,38 @@
+"""Cascade email_bot deletes from user
+
+Revision ID: 7c3f9a1e5b2d
+Revises: 21bedfb8c54d
+Create Date: 2025-10-02 11:42:37.512904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f9a1e5b2d'
+down_revision = '21bedfb8c54d'
+branch_labels = None
+depends_on = None
+
+# The initial migration created the FK without a name; the naming convention
+# lets batch mode (SQLite) find and replace it.
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+
+def upgrade():
+    with op.batch_alter_table('email_bot', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('fk_email_bot_user_id_user', type_='foreignkey')
+        batch_op.create_foreign_key(
+            'fk_email_bot_user_id_user', 'user', ['user_id'], ['id'], ondelete='CASCADE'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('email_bot', naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('fk_email_bot_user_id_user', type_='foreignkey')
+        batch_op.create_foreign_key(
+            'fk_email_bot_user_id_user', 'user', ['user_id'], ['id']
+        )
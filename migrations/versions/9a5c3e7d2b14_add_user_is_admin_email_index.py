@@ -0,0 +1,26 @@
+"""Add a covering (is_admin, email) index on user
+
+Revision ID: 9a5c3e7d2b14
+Revises: 4e8b2d6f1a9c
+Create Date: 2025-10-06 10:02:48.731254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a5c3e7d2b14'
+down_revision = '4e8b2d6f1a9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_is_admin_email', ['is_admin', 'email'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_is_admin_email')
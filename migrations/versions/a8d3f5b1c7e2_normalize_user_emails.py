@@ -0,0 +1,37 @@
+"""Normalize existing user emails to trimmed lowercase
+
+Revision ID: a8d3f5b1c7e2
+Revises: f2b6d8c4a1e9
+Create Date: 2025-10-09 10:47:12.385561
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f5b1c7e2'
+down_revision = 'f2b6d8c4a1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # New emails are normalized on write; bring existing rows in line so the
+    # equality lookups on the unique email index find them. Rows whose
+    # normalized form is already taken are left as they are.
+    user = sa.table('user', sa.column('id', sa.String), sa.column('email', sa.String))
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(user.c.id, user.c.email)).all()
+    taken = {row.email for row in rows}
+    for row in rows:
+        normalized = row.email.strip().lower()
+        if normalized != row.email and normalized not in taken:
+            conn.execute(user.update().where(user.c.id == row.id).values(email=normalized))
+            taken.discard(row.email)
+            taken.add(normalized)
+
+
+def downgrade():
+    # The original casing is not recorded
+    pass
@@ -0,0 +1,53 @@
+"""Add an indexed api_key_hmac column on user and backfill it
+
+Revision ID: b3d7f1a2c6e8
+Revises: 9a5c3e7d2b14
+Create Date: 2025-10-07 09:14:22.518307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.crypto import api_key_hmac, decrypt_value
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7f1a2c6e8'
+down_revision = '9a5c3e7d2b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('api_key_hmac', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_api_key_hmac'), ['api_key_hmac'], unique=True)
+
+    # Backfill from the existing encrypted keys
+    user = sa.table(
+        'user',
+        sa.column('id', sa.String),
+        sa.column('api_key_encrypted', sa.String),
+        sa.column('api_key_hmac', sa.String),
+    )
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(user.c.id, user.c.api_key_encrypted)
+        .where(user.c.api_key_encrypted.isnot(None))
+    ).all()
+    if rows:
+        conn.execute(
+            user.update()
+            .where(user.c.id == sa.bindparam('user_id'))
+            .values(api_key_hmac=sa.bindparam('hmac')),
+            [
+                {"user_id": row.id, "hmac": api_key_hmac(decrypt_value(row.api_key_encrypted))}
+                for row in rows
+            ]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_api_key_hmac'))
+        batch_op.drop_column('api_key_hmac')
@@ -0,0 +1,26 @@
+"""Add a composite (user_id, timestamp DESC) index on log
+
+Revision ID: d4a8e2b6f3c1
+Revises: b3d7f1a2c6e8
+Create Date: 2025-10-07 11:40:05.263918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8e2b6f3c1'
+down_revision = 'b3d7f1a2c6e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.create_index('ix_log_user_ts', ['user_id', sa.text('timestamp DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.drop_index('ix_log_user_ts')
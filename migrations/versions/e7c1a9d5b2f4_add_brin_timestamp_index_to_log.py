@@ -0,0 +1,37 @@
+"""Add a BRIN index on log.timestamp (PostgreSQL only)
+
+Revision ID: e7c1a9d5b2f4
+Revises: d4a8e2b6f3c1
+Create Date: 2025-10-07 15:22:47.904126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c1a9d5b2f4'
+down_revision = 'd4a8e2b6f3c1'
+branch_labels = None
+depends_on = None
+
+# log is append-only in timestamp order, so a BRIN index covers time-range
+# scans at a fraction of a B-tree's size and insert cost. Other backends
+# have no BRIN and keep using ix_log_user_ts; the index is deliberately not
+# declared on the model, where it would become a B-tree elsewhere.
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'ix_log_ts_brin', 'log', ['timestamp'],
+        postgresql_using='brin',
+        postgresql_with={'pages_per_range': 32},
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_log_ts_brin', table_name='log')
@@ -0,0 +1,30 @@
+"""Add a covering (user_id, endpoint, status_code, timestamp) index on log
+
+Revision ID: f2b6d8c4a1e9
+Revises: e7c1a9d5b2f4
+Create Date: 2025-10-08 09:05:31.617442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8c4a1e9'
+down_revision = 'e7c1a9d5b2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_log_user_endpoint_status_ts',
+            ['user_id', 'endpoint', 'status_code', 'timestamp'],
+            unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.drop_index('ix_log_user_endpoint_status_ts')
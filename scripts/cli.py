@@ -11,6 +11,9 @@ python -m scripts.cli create --name "Alice" --email "alice@example.com"
 # Create an admin user
 python -m scripts.cli create --name "Bob" --email "bob@example.com" --admin
 
+# Create many users from a CSV (name,email[,admin]) or JSON list
+python -m scripts.cli create-bulk users.csv
+
 # Approve user
 python -m scripts.cli approve alice@example.com
 
@@ -26,23 +29,40 @@ python -m scripts.cli delete alicia@example.com
 # List all users
 python -m scripts.cli list-user
 
-# Rotate encryption keys
+# Rotate encryption keys (restart the app between the two Fernet steps)
 python -m scripts.cli rotate --fernet-key
+python -m scripts.cli rotate --reencrypt
 python -m scripts.cli rotate --api-secret-key
 
 # Generate new keys
 python -m scripts.cli generate-keys
 """
+import csv
+import json
 import os
 import click
-import uuid
+from secrets import token_hex
 from cryptography.fernet import Fernet
+from sqlalchemy import bindparam, delete, exists, insert, select, update
+from sqlalchemy.orm import load_only
 from app import create_app
 from app.extensions import db
 from app.models import User
+from app.utils.cache import invalidate_admin_emails, invalidate_admin_users_cache
+from app.utils.crypto import api_key_hmac, decrypt_values, encrypt_value
 from config import Config
+from scripts.utils import dump_env, load_env, normalize_email, uuid7_hex
+
+_app = None
+
+
+def get_app():
+    """Create the Flask app on first use, so --help and init-hermes don't boot it"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
 
-app = create_app()
 
 @click.group()
 def cli():
@@ -50,11 +70,13 @@ def cli():
 
     Available Commands:
       create         Create a new user (pending approval)
+      create-bulk    Create users from a CSV or JSON file
       approve        Approve a user
       update         Update user details (make admin, rename, change email)
       delete         Delete a user
       list-user      List all users
-      rotate         Rotate encryption keys (--fernet-key, --api-secret-key)
+      rehash-api-keys  Re-derive API key lookup hashes (after API_KEY_HASH_SECRET changes)
+      rotate         Rotate encryption keys (--fernet-key, --reencrypt, --api-secret-key)
       generate-keys  Generate new keys
     """
     pass
@@ -68,12 +90,13 @@ def cli():
 @click.option("--admin", is_flag=True, help="Make this user an admin")
 def create_user(name, email, admin):
     """Create a new user (pending approval)"""
-    with app.app_context():
-        if User.query.filter_by(email=email).first():
+    email = normalize_email(email)
+    with get_app().app_context():
+        if db.session.scalar(select(exists().where(User.email == email))):
             click.echo("❌ User with this email already exists")
             return
 
-        plain_key = str(uuid.uuid4().hex)
+        plain_key = token_hex(16)
         user = User(
             name=name,
             email=email,
@@ -82,11 +105,75 @@ def create_user(name, email, admin):
         )
         db.session.add(user)
         db.session.commit()
+        invalidate_admin_users_cache()
+        if admin:
+            invalidate_admin_emails()
 
         click.echo(f"✅ User created: {user.name} ({user.email})")
         click.echo(f"   Pending approval. API Key (plain): {plain_key}")
 
 
+# -------------------------
+# CREATE USERS IN BULK
+# -------------------------
+def _read_users_file(path):
+    """Yield (name, email, admin) from a CSV with a name,email[,admin] header or a JSON list"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            admin = row.get("admin", False)
+            if isinstance(admin, str):
+                admin = admin.strip().lower() in ("1", "true", "yes", "y")
+            yield (row.get("name") or "").strip(), normalize_email(row.get("email") or ""), bool(admin)
+
+
+@cli.command("create-bulk")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def create_users_bulk(path):
+    """Create users (pending approval) from a CSV or JSON file"""
+    with get_app().app_context():
+        # One SELECT for every known email, then set lookups per input row
+        existing = set(db.session.scalars(select(User.email)))
+        to_insert, keys = [], []
+        for name, email, admin in _read_users_file(path):
+            if not name or not email:
+                click.echo(f"⚠️ Skipping row without name/email: {name or email or '(empty)'}")
+                continue
+            if email in existing:
+                click.echo(f"ℹ️ Already exists: {email}")
+                continue
+            existing.add(email)
+            plain_key = token_hex(16)
+            to_insert.append({
+                "id": uuid7_hex(),
+                "name": name,
+                "email": email,
+                "api_key_plain_encrypted": encrypt_value(plain_key),
+                "is_admin": admin,
+            })
+            keys.append((name, email, plain_key))
+
+        if not to_insert:
+            click.echo("No new users to create")
+            return
+
+        # A single executemany INSERT for all new users
+        db.session.execute(insert(User), to_insert)
+        db.session.commit()
+        invalidate_admin_users_cache()
+        if any(row["is_admin"] for row in to_insert):
+            invalidate_admin_emails()
+
+        click.echo("\n".join(
+            f"✅ User created: {name} ({email}) — API Key (plain): {plain_key}"
+            for name, email, plain_key in keys
+        ))
+        click.echo(f"   {len(keys)} user(s) pending approval.")
+
+
 # -------------------------
 # APPROVE USER
 # -------------------------
@@ -94,10 +181,19 @@ def create_user(name, email, admin):
 @click.argument("email")
 def approve_user(email):
     """Approve a user and store their API key as encrypted"""
+    email = normalize_email(email)
     from app.utils.mailer import send_email
 
-    with app.app_context():
-        user = User.query.filter_by(email=email).first()
+    with get_app().app_context():
+        user = (
+            User.query
+            .options(load_only(
+                User.id, User.name, User.email,
+                User.api_key_approved, User.api_key_plain_encrypted
+            ))
+            .filter_by(email=email)
+            .first()
+        )
         if not user:
             click.echo("❌ User not found")
             return
@@ -108,13 +204,20 @@ def approve_user(email):
             click.echo("❌ No pending API key found for this user")
             return
 
-        # Move plain API key to encrypted field via property
-        user.api_key = user.api_key_plain
-        user.api_key_plain = None
-        user.api_key_approved = True
+        # Move plain API key to the encrypted field in a single UPDATE
+        api_key = user.api_key_plain  # decrypted once, reused below
+        db.session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(
+                api_key_encrypted=encrypt_value(api_key),
+                api_key_hmac=api_key_hmac(api_key),
+                api_key_plain_encrypted=None,
+                api_key_approved=True,
+            )
+        )
         db.session.commit()
-
-        api_key = user.api_key  # decrypted automatically via property
+        invalidate_admin_users_cache()
 
         click.echo(f"✅ User approved: {user.name} ({user.email})")
         click.echo(f"   API Key (give to user): {api_key}")
@@ -126,7 +229,7 @@ def approve_user(email):
             html_template="approval.html",
             template_context={
                 "name": user.name, 
-                "api_key": user.api_key, 
+                "api_key": api_key, 
                 "hermes_homepage": Config.HERMES_HOMEPAGE
             }
         )
@@ -143,13 +246,19 @@ def approve_user(email):
 @click.argument("email")
 def delete_user(email):
     """Delete a user by email"""
-    with app.app_context():
-        user = User.query.filter_by(email=email).first()
-        if not user:
+    email = normalize_email(email)
+    with get_app().app_context():
+        row = db.session.execute(select(User.id, User.is_admin).where(User.email == email)).first()
+        if row is None:
             click.echo("❌ User not found")
             return
-        db.session.delete(user)
+        was_admin = row.is_admin
+        # EmailBots and Logs are removed by ON DELETE CASCADE in the database
+        db.session.execute(delete(User).where(User.email == email))
         db.session.commit()
+        invalidate_admin_users_cache()
+        if was_admin:
+            invalidate_admin_emails()
         click.echo(f"🗑️ Deleted user {email}")
 
 
@@ -164,23 +273,37 @@ def delete_user(email):
 @click.option("--revoke-admin", is_flag=True, help="Remove admin rights")
 def update_user(email, name, new_email, make_admin, revoke_admin):
     """Update user details"""
-    with app.app_context():
-        user = User.query.filter_by(email=email).first()
-        if not user:
+    email = normalize_email(email)
+    new_email = normalize_email(new_email)
+    values = {}
+    if name:
+        values["name"] = name
+    if new_email:
+        values["email"] = new_email
+    if make_admin:
+        values["is_admin"] = True
+    if revoke_admin:
+        values["is_admin"] = False
+
+    with get_app().app_context():
+        # All changes in one UPDATE (no SELECT, no dirty-tracking flush)
+        if values:
+            found = db.session.execute(
+                update(User).where(User.email == email).values(**values)
+            ).rowcount > 0
+            db.session.commit()
+        else:
+            found = db.session.scalar(select(exists().where(User.email == email)))
+        if not found:
             click.echo("❌ User not found")
             return
+        if values:
+            invalidate_admin_users_cache()
 
-        if name:
-            user.name = name
-        if new_email:
-            user.email = new_email
-        if make_admin:
-            user.is_admin = True
-        if revoke_admin:
-            user.is_admin = False
-
-        db.session.commit()
-        click.echo(f"✅ Updated user {user.email}")
+        # An email change may concern an admin; re-reading the cache is cheap
+        if make_admin or revoke_admin or new_email:
+            invalidate_admin_emails()
+        click.echo(f"✅ Updated user {new_email or email}")
 
 
 # -------------------------
@@ -189,15 +312,52 @@ def update_user(email, name, new_email, make_admin, revoke_admin):
 @cli.command("list-user")
 def list_users():
     """List all users"""
-    with app.app_context():
-        users = User.query.all()
-        if not users:
+    with get_app().app_context():
+        # Stream only the displayed columns; one write per 500 users
+        result = db.session.execute(
+            select(User.name, User.email, User.api_key_approved, User.is_admin)
+            .execution_options(yield_per=500)
+        )
+        found = False
+        for users in result.partitions():
+            found = True
+            click.echo("\n".join(
+                f"- {u.name} ({u.email}) ["
+                f"{'✅ Approved' if u.api_key_approved else '⏳ Pending'}, "
+                f"{'👮 Admin' if u.is_admin else '👤 User'}]"
+                for u in users
+            ))
+        if not found:
             click.echo("No users found")
+
+
+# -------------------------
+# REHASH API KEYS
+# -------------------------
+@cli.command("rehash-api-keys")
+def rehash_api_keys():
+    """Re-derive every user's api_key_hmac after API_KEY_HASH_SECRET changed"""
+    with get_app().app_context():
+        rows = db.session.execute(
+            select(User.id, User.api_key_encrypted).where(User.api_key_encrypted.is_not(None))
+        ).all()
+        if not rows:
+            click.echo("No approved API keys to rehash")
             return
-        for u in users:
-            status = "✅ Approved" if u.api_key_approved else "⏳ Pending"
-            role = "👮 Admin" if u.is_admin else "👤 User"
-            click.echo(f"- {u.name} ({u.email}) [{status}, {role}]")
+
+        api_keys = decrypt_values([row.api_key_encrypted for row in rows])
+        table = User.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"))
+            .values(api_key_hmac=bindparam("new_hmac")),
+            [
+                {"row_id": row.id, "new_hmac": api_key_hmac(api_key)}
+                for row, api_key in zip(rows, api_keys)
+            ]
+        )
+        db.session.commit()
+        click.echo(f"✅ Rehashed {len(rows)} API key(s)")
 
 
 # -------------------------
@@ -220,6 +380,9 @@ python -m scripts.cli create --name "Alice" --email "alice@example.com"
 # Create an admin user
 python -m scripts.cli create --name "Bob" --email "bob@example.com" --admin
 
+# Create many users from a CSV (name,email[,admin]) or JSON list
+python -m scripts.cli create-bulk users.csv
+
 # Approve user
 python -m scripts.cli approve alice@example.com
 
@@ -235,8 +398,9 @@ python -m scripts.cli delete alicia@example.com
 # List all users
 python -m scripts.cli list-user
 
-# Rotate encryption keys
+# Rotate encryption keys (restart the app between the two Fernet steps)
 python -m scripts.cli rotate --fernet-key
+python -m scripts.cli rotate --reencrypt
 python -m scripts.cli rotate --api-secret-key
 """
     click.echo(examples)
@@ -248,21 +412,25 @@ python -m scripts.cli rotate --api-secret-key
 @cli.command("rotate")
 @click.option("--fernet-key", is_flag=True, help="Rotate the Fernet encryption key")
 @click.option("--api-secret-key", is_flag=True, help="Rotate the API secret key")
-def rotate_keys(fernet_key, api_secret_key):
+@click.option("--reencrypt", is_flag=True,
+              help="Re-encrypt data under the new Fernet key (after restarting the app)")
+def rotate_keys(fernet_key, api_secret_key, reencrypt):
     """Rotate encryption keys using scripts/rotate_keys.py"""
-    import subprocess
-    args = ["python", '-m', "scripts.rotate_keys"]
-    if fernet_key:
-        args.append("--fernet-key")
-    if api_secret_key:
-        args.append("--api-secret-key")
-    subprocess.run(args)
+    from scripts.rotate_keys import rotate
+
+    # Runs on this process's app; only re-encryption touches the database
+    rotate(
+        get_app() if reencrypt else None,
+        fernet_key=fernet_key,
+        api_static_key=api_secret_key,
+        reencrypt=reencrypt
+    )
 
 # -------------------------
 # INIT HERMES (GENERATE KEYS)
 # -------------------------
 def generate_static_api_key():
-    return uuid.uuid4().hex  # 32 hex characters
+    return token_hex(16)  # 32 hex characters
 
 def generate_fernet_key():
     return Fernet.generate_key().decode()  # base64-encoded string
@@ -272,6 +440,7 @@ def init_hermes():
     """
     Generate new keys (FERNET_KEY + API_STATIC_KEY) in .env and add them.
     If .env already has keys, they will be overwritten.
+    API_KEY_HASH_SECRET is only generated when missing.
     """
 
     env_path = ".env"
@@ -279,36 +448,16 @@ def init_hermes():
         click.echo("❌ .env file not found in current directory.")
         return
 
-    # Read all lines from .env
-    with open(env_path, "r") as f:
-        lines = f.readlines()
-
-    # Prepare new keys
+    # Parse once, set both keys (existing entries keep their position), write back
+    env = load_env(env_path)
     new_fernet_key = generate_fernet_key()
     new_api_static_key = generate_static_api_key()
-
-    # Overwrite or add the keys
-    found_fernet = False
-    found_api_static = False
-    new_lines = []
-    for line in lines:
-        if line.startswith("FERNET_KEY="):
-            new_lines.append(f"FERNET_KEY={new_fernet_key}\n")
-            found_fernet = True
-        elif line.startswith("API_STATIC_KEY="):
-            new_lines.append(f"API_STATIC_KEY={new_api_static_key}\n")
-            found_api_static = True
-        else:
-            new_lines.append(line)
-
-    if not found_fernet:
-        new_lines.append(f"FERNET_KEY={new_fernet_key}\n")
-    if not found_api_static:
-        new_lines.append(f"API_STATIC_KEY={new_api_static_key}\n")
-
-    # Write back to .env
-    with open(env_path, "w") as f:
-        f.writelines(new_lines)
+    env["FERNET_KEY"] = new_fernet_key
+    env["API_STATIC_KEY"] = new_api_static_key
+    if not env.get("API_KEY_HASH_SECRET"):
+        env["API_KEY_HASH_SECRET"] = token_hex(32)
+        click.echo("✅ API_KEY_HASH_SECRET has been generated and written to .env")
+    dump_env(env, env_path)
 
     click.echo("✅ FERNET_KEY and API_STATIC_KEY have been generated and written to .env")
     click.echo(f"FERNET_KEY={new_fernet_key}")
@@ -4,41 +4,146 @@ Author: Indrajit Ghosh
 Created On: Sep 23, 2025
 
 Rotates the Fernet key used for encrypting sensitive data in the database.
+
+Rotation never blocks reads: the app decrypts with FERNET_KEY and every key in
+OLD_FERNET_KEYS (MultiFernet). A rotation is two separate runs:
+
+1. `--fernet-key` writes a new FERNET_KEY and keeps the previous one in
+   OLD_FERNET_KEYS. The database is not touched. Restart every app worker so
+   they all decrypt with both keys.
+2. `--reencrypt`, once every worker runs with the new key, re-encrypts the rows
+   in committed batches, clears the cached EmailBot settings and drops
+   OLD_FERNET_KEYS. Restart the workers again to retire the old key.
 """
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from secrets import token_hex
 from dotenv import load_dotenv
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from sqlalchemy import bindparam, select, update
 from app import create_app, db
 from app.models import User, EmailBot
-from app.utils.crypto import decrypt_value
+from app.utils.cache import invalidate_all_bot_configs
+from app.utils.crypto import reencrypt
+from scripts.utils import dump_env, load_env
 
 ENV_FILE = ".env"
 
 
-def update_env_var(key, new_value):
-    """Update a key=value pair in the .env file"""
-    lines = []
-    updated = False
-    if os.path.exists(ENV_FILE):
-        with open(ENV_FILE, "r") as f:
-            for line in f:
-                if line.startswith(f"{key}="):
-                    lines.append(f"{key}={new_value}\n")
-                    updated = True
-                else:
-                    lines.append(line)
+@lru_cache(maxsize=4)
+def _rotation_ciphers(old_keys, new_key):
+    """(new Fernet, MultiFernet accepting the new and old keys), built once per process"""
+    new_cipher = Fernet(new_key.encode())
+    return new_cipher, MultiFernet([new_cipher, *(Fernet(key.encode()) for key in old_keys)])
+
+
+def _reencrypt_rows(old_keys, new_key, fields, rows):
+    """
+    Process-pool worker: re-encrypt `rows` (`(id, *tokens)` tuples) and return
+    the executemany parameters for the UPDATE built by `reencrypt_table`.
+    """
+    new_cipher, old_cipher = _rotation_ciphers(old_keys, new_key)
+    params = []
+    for row_id, *tokens in rows:
+        values = {"row_id": row_id}
+        for field, token in zip(fields, tokens):
+            values[f"new_{field}"] = reencrypt(token, old_cipher, new_cipher) if token else None
+        params.append(values)
+    return params
+
+
+def reencrypt_table(model, fields, old_keys, new_key, batch_size=1000, workers=None):
+    """
+    Re-encrypt the Fernet `fields` of every `model` row under `new_key`.
+
+    Tokens may be under `new_key` or any of `old_keys` (MultiFernet), so an
+    interrupted run can simply be repeated. Rows are read `batch_size` at a time
+    (keyset pagination on the primary key, only the id and the encrypted columns);
+    the CPU-bound re-encryption of up to `workers` batches at once runs in a
+    process pool, and each batch is written back with one executemany UPDATE and
+    a commit, so the app keeps reading rows under either key meanwhile. The
+    plaintexts (and so `User.api_key_hmac`) are unchanged.
+    """
+    workers = workers or os.cpu_count() or 1
+    reencrypt_rows = partial(_reencrypt_rows, tuple(old_keys), new_key, tuple(fields))
+
+    # Every statement is built once per table; executions only bind parameters
+    # and hit SQLAlchemy's compiled-statement cache
+    columns = [getattr(model, field) for field in fields]
+    table = model.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values({field: bindparam(f"new_{field}") for field in fields})
+    )
+    first_query = select(model.id, *columns).order_by(model.id).limit(batch_size)
+    next_query = first_query.where(model.id > bindparam("last_id"))
+
+    def next_batch(last_id):
+        if last_id is None:
+            result = db.session.execute(first_query)
+        else:
+            result = db.session.execute(next_query, {"last_id": last_id})
+        return [tuple(row) for row in result]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        last_id = None
+        exhausted = False
+        while not exhausted:
+            batches = []
+            while len(batches) < workers:
+                rows = next_batch(last_id)
+                if not rows:
+                    exhausted = True
+                    break
+                batches.append(rows)
+                last_id = rows[-1][0]
+
+            # Database writes stay in this process, one transaction per batch
+            for params in pool.map(reencrypt_rows, batches):
+                db.session.execute(stmt, params)
+                db.session.commit()
+
+
+def reencrypt_all(app, env):
+    """
+    Re-encrypt every row under the .env FERNET_KEY, then drop OLD_FERNET_KEYS.
+
+    This is the second step of a rotation. Run it only after every worker has
+    been restarted with the new FERNET_KEY: the rows it writes can't be
+    decrypted by a worker that still has just the old key.
+    """
+    new_key = env.get("FERNET_KEY") or os.getenv("FERNET_KEY")
+    old_keys = [k for k in env.get("OLD_FERNET_KEYS", "").split(",") if k]
+    if not new_key:
+        print("❌ No existing FERNET_KEY found in .env")
+        return
+
+    print("🔁 Re-encrypting data with the current FERNET_KEY...")
+    with app.app_context():
+        reencrypt_table(User, ("api_key_encrypted", "api_key_plain_encrypted"), old_keys, new_key)
+        reencrypt_table(EmailBot, ("email_encrypted", "password_encrypted"), old_keys, new_key)
+
+        # Cached EmailBot settings may still hold old-key ciphertexts (a shared
+        # Redis cache outlives the restart; per-process caches don't)
+        invalidate_all_bot_configs()
 
-    if not updated:
-        lines.append(f"{key}={new_value}\n")
+    # Every row is now under FERNET_KEY; the old keys are no longer needed
+    env.pop("OLD_FERNET_KEYS", None)
+    print("✅ Data re-encrypted; OLD_FERNET_KEYS removed.")
+    print("ℹ️ Restart the app to retire the old key(s).")
 
-    with open(ENV_FILE, "w") as f:
-        f.writelines(lines)
 
+def rotate_fernet_key(env):
+    """
+    Rotate FERNET_KEY, keeping the previous key(s) in OLD_FERNET_KEYS.
 
-def rotate_fernet_key(app):
-    """Rotate FERNET_KEY and re-encrypt all data"""
-    old_key = os.getenv("FERNET_KEY")
+    Nothing is re-encrypted here: the running workers only know the old key
+    until they are restarted. Run `--reencrypt` after the restart.
+    """
+    old_key = env.get("FERNET_KEY") or os.getenv("FERNET_KEY")
     if not old_key:
         print("❌ No existing FERNET_KEY found in .env")
         return
@@ -48,41 +153,40 @@ def rotate_fernet_key(app):
     # Generate new key
     new_key = Fernet.generate_key().decode()
 
-    with app.app_context():
-        users = User.query.all()
-        bots = EmailBot.query.all()
+    old_keys = [old_key, *(k for k in env.get("OLD_FERNET_KEYS", "").split(",") if k)]
+    env["FERNET_KEY"] = new_key
+    env["OLD_FERNET_KEYS"] = ",".join(old_keys)
 
-        for user in users:
-            if user.api_key_encrypted:
-                plain = decrypt_value(user.api_key_encrypted, key=old_key)
-                user._set_api_key(plain, fernet_key=new_key)
+    print("✅ FERNET_KEY rotated; the previous key is kept in OLD_FERNET_KEYS.")
+    print("ℹ️ Restart every app worker, then run the rotation again with --reencrypt.")
 
-            if user.api_key_plain_encrypted:
-                plain = decrypt_value(user.api_key_plain_encrypted, key=old_key)
-                user._set_api_key_plain(plain, fernet_key=new_key)
 
-        for bot in bots:
-            if bot.email_encrypted:
-                plain = decrypt_value(bot.email_encrypted, key=old_key)
-                bot._set_email(plain, fernet_key=new_key)
+def rotate_api_static_key(env):
+    """Generate a new API_STATIC_KEY and set it in `env`"""
+    new_key = token_hex(16)  # 32 hex characters, as generated by init-hermes
+    env["API_STATIC_KEY"] = new_key
+    print("✅ API_STATIC_KEY rotated successfully.")
 
-            if bot.password_encrypted:
-                plain = decrypt_value(bot.password_encrypted, key=old_key)
-                bot._set_password(plain, fernet_key=new_key)
 
-        db.session.commit()
+def rotate(app, fernet_key=False, api_static_key=False, reencrypt=False):
+    """Run the requested rotations against the .env file (read and written once)"""
+    if fernet_key and reencrypt:
+        print("❌ Restart the app on the new FERNET_KEY before running --reencrypt")
+        return
 
-    # Update the .env with new key
-    update_env_var("FERNET_KEY", new_key)
-    print("✅ FERNET_KEY rotated successfully and data re-encrypted.")
+    env = load_env()
+    original_env = dict(env)
+    if fernet_key:
+        rotate_fernet_key(env)
+    elif reencrypt:
+        reencrypt_all(app, env)
 
+    if api_static_key:
+        rotate_api_static_key(env)
 
-def rotate_api_static_key():
-    """Generate and update API_STATIC_KEY"""
-    from scripts.generate_keys import generate_static_api_key
-    new_key = generate_static_api_key()
-    update_env_var("API_STATIC_KEY", new_key)
-    print("✅ API_STATIC_KEY rotated successfully.")
+    # One write for all rotated keys; a failed re-encryption leaves .env untouched
+    if env != original_env:
+        dump_env(env)
 
 
 if __name__ == "__main__":
@@ -91,19 +195,19 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--fernet-key", action="store_true",
-        help="Rotate the FERNET_KEY and re-encrypt all DB fields"
+        help="Rotate the FERNET_KEY (then restart the app and run --reencrypt)"
     )
     parser.add_argument(
         "--api-static-key", action="store_true",
         help="Rotate the API_STATIC_KEY only"
     )
+    parser.add_argument(
+        "--reencrypt", action="store_true",
+        help="Re-encrypt DB fields still under OLD_FERNET_KEYS with FERNET_KEY, then drop them"
+    )
     args = parser.parse_args()
 
     load_dotenv(ENV_FILE)
-    app = create_app()
-
-    if args.fernet_key:
-        rotate_fernet_key(app)
+    app = create_app() if args.reencrypt else None
 
-    if args.api_static_key:
-        rotate_api_static_key()
+    rotate(app, fernet_key=args.fernet_key, api_static_key=args.api_static_key, reencrypt=args.reencrypt)
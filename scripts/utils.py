@@ -3,7 +3,15 @@
 # Author: Indrajit Ghosh
 # Created On: May 10, 2025
 #
+import os
+import stat
+import time
+import uuid
 from datetime import datetime, timezone
+from dotenv import dotenv_values
+
+_UTC = timezone.utc
+_now = datetime.now
 
 def utcnow():
     """
@@ -12,4 +20,111 @@ def utcnow():
     Returns:
         datetime: A datetime object representing the current UTC time.
     """
-    return datetime.now(timezone.utc)
+    return _now(_UTC)
+
+
+def atomic_write(path, text):
+    """
+    Replace the file at `path` with `text` without ever leaving it half written.
+
+    The text goes to `<path>.tmp`, is fsync'ed, and is then renamed over `path`
+    (atomic on POSIX and Windows) and the directory is fsync'ed, so a crash leaves
+    either the old or the new file.
+    The file keeps the permissions of the one it replaces (0600 for a new file),
+    so a locked-down secrets file never becomes readable by others.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o600
+    tmp_path = f"{path}.tmp"
+    # Created owner-only, then given the original mode before anything is written
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(tmp_path, mode)
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Persist the rename itself; without this a crash can bring back the old file
+    if hasattr(os, "O_DIRECTORY"):  # directories can't be opened on Windows
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class EnvFile(dict):
+    """`load_env` result: {key: value} plus the original line of each key"""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = {}  # key -> (value as loaded, original line)
+
+
+def load_env(path=".env"):
+    """
+    Parse the .env file once into an ordered {key: value} dict.
+
+    Values are unquoted the way python-dotenv (and so the app) reads them,
+    e.g. FERNET_KEY="..." yields the bare key. Comment and blank lines are
+    kept under `#<line number>` entries, and unchanged keys keep their
+    original line, so `dump_env` writes them back as they were.
+    """
+    env = EnvFile()
+    if os.path.exists(path):
+        values = dotenv_values(path)
+        with open(path, "r") as f:
+            for number, line in enumerate(f):
+                line = line.rstrip("\n")
+                key, sep, value = line.partition("=")
+                key = key.strip()
+                if sep and key and not key.startswith("#"):
+                    value = values.get(key, value)
+                    env[key] = value
+                    env.lines[key] = (value, line)
+                else:
+                    env[f"#{number}"] = line
+    return env
+
+
+def dump_env(env, path=".env"):
+    """Write `env` (from `load_env`) back in one pass, replacing the file atomically"""
+    lines = getattr(env, "lines", {})
+
+    def render(key, value):
+        if key.startswith("#"):
+            return value
+        loaded, line = lines.get(key, (None, None))
+        return line if line is not None and loaded == value else f"{key}={value}"
+
+    atomic_write(path, "".join(f"{render(key, value)}\n" for key, value in env.items()))
+
+
+def normalize_email(email):
+    """
+    Canonical form of an email address for storage and lookup (trimmed, lowercase),
+    so lookups are plain equality on the unique `user.email` index.
+    Non-string input is returned unchanged for the caller's validation.
+    """
+    return email.strip().lower() if isinstance(email, str) else email
+
+
+def uuid7_hex():
+    """
+    Generate a time-ordered UUID (version 7, RFC 9562) as a 32-char hex string.
+
+    The first 48 bits are the Unix time in milliseconds, so new ids sort after
+    older ones and land at the right edge of the primary-key index instead of
+    at random pages. The remaining 74 bits are random.
+
+    Returns:
+        str: Same format as `uuid.uuid4().hex`.
+    """
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)   # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)   # RFC 4122 variant
+    return uuid.UUID(int=value).hex
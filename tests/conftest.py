@@ -0,0 +1,99 @@
+# tests/conftest.py
+import os
+import smtplib
+from contextlib import contextmanager
+from secrets import token_hex
+
+# Settings read when `config` is imported; set before any app import
+os.environ.setdefault("API_KEY_HASH_SECRET", "test-api-key-hash-secret")
+os.environ.setdefault("BOT_SMTP_PORT", "587")
+
+import pytest
+
+from app import create_app
+from app.extensions import db
+from app.models import User
+from app.utils.log_buffer import log_buffer
+from app.utils.smtp_pool import smtp_pool
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'hermes.db'}"
+        CACHE_TYPE = "SimpleCache"
+        JINJA_BYTECODE_CACHE_DIR = str(tmp_path / "jinja")
+
+    app = create_app(TestConfig)
+    # No app context stays pushed: each test request gets its own (and its own `g`)
+    with app.app_context():
+        db.create_all()
+    yield app
+    log_buffer.flush()
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create an approved user; returns (user_id, api_key)"""
+    def make_user(email=None, is_admin=False, hermes_default_usage=0):
+        api_key = token_hex(16)
+        user = User(
+            name="Test User",
+            email=email or f"{token_hex(4)}@example.com",
+            is_admin=is_admin,
+            api_key_approved=True,
+            hermes_default_usage=hermes_default_usage,
+        )
+        user.api_key = api_key
+        with app.app_context():
+            db.session.add(user)
+            db.session.commit()
+            return user.id, api_key
+    return make_user
+
+
+@pytest.fixture
+def default_usage(app):
+    """Read a user's hermes_default_usage from the database"""
+    def default_usage(user_id):
+        with app.app_context():
+            return db.session.get(User, user_id).hermes_default_usage
+    return default_usage
+
+
+def auth(api_key):
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+class FakeSMTP:
+    """Pooled-session stand-in; recipients containing 'reject' are refused"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendmail(self, sender, recipients, message):
+        if any("reject" in r for r in recipients):
+            raise smtplib.SMTPRecipientsRefused({r: (550, b"rejected") for r in recipients})
+        self.sent.append((sender, recipients))
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    fake = FakeSMTP()
+
+    @contextmanager
+    def connection(server, port, sender, password):
+        yield fake
+
+    monkeypatch.setattr(smtp_pool, "connection", connection)
+    return fake
+
@@ -0,0 +1,91 @@
+# tests/test_admin_users.py
+import pytest
+
+from tests.conftest import auth
+
+
+@pytest.fixture
+def admin_key(make_user):
+    _, api_key = make_user(is_admin=True)
+    return api_key
+
+
+def _users(client, admin_key, query):
+    return client.get(f"/api/v1/admin/users?{query}", headers=auth(admin_key))
+
+
+def _walk(client, admin_key, limit):
+    """Follow next_cursor to the end; returns the pages' user ids"""
+    pages, after = [], None
+    while True:
+        query = f"limit={limit}" + (f"&after={after}" if after else "")
+        resp = _users(client, admin_key, query)
+        assert resp.status_code == 200
+        pages.append([u["id"] for u in resp.json["users"]])
+        after = resp.json["next_cursor"]
+        if after is None:
+            return pages
+
+
+def test_cursor_walks_every_user_once(client, make_user, admin_key):
+    for _ in range(4):
+        make_user()
+
+    pages = _walk(client, admin_key, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [user_id for page in pages for user_id in page]
+    assert ids == sorted(set(ids))
+
+
+def test_cursor_on_exact_multiple_ends_with_empty_page(client, make_user, admin_key):
+    for _ in range(3):
+        make_user()
+
+    pages = _walk(client, admin_key, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2, 0]
+
+
+def test_cursor_past_the_end(client, admin_key):
+    resp = _users(client, admin_key, "limit=10&after=ffffffffffffffffffffffffffffffff")
+    assert resp.json["users"] == []
+    assert resp.json["next_cursor"] is None
+
+
+def test_cursor_limit_is_validated_and_clamped(client, make_user, admin_key):
+    make_user()
+    assert _users(client, admin_key, "limit=abc").status_code == 400
+
+    resp = _users(client, admin_key, "limit=0")
+    assert len(resp.json["users"]) == 1
+    assert resp.json["next_cursor"] is not None
+
+    resp = _users(client, admin_key, "limit=100000")
+    assert len(resp.json["users"]) == 2
+    assert resp.json["next_cursor"] is None
+
+
+def test_pages_report_totals(client, make_user, admin_key):
+    for _ in range(4):
+        make_user()
+
+    resp = _users(client, admin_key, "page=2&per_page=2")
+
+    assert resp.status_code == 200
+    assert len(resp.json["users"]) == 2
+    assert (resp.json["page"], resp.json["pages"], resp.json["total"]) == (2, 3, 5)
+
+
+def test_page_past_the_end_is_empty(client, make_user, admin_key):
+    make_user()
+    resp = _users(client, admin_key, "page=5&per_page=10")
+    assert resp.json["users"] == []
+    assert resp.json["pages"] == 1
+
+
+def test_page_params_are_validated_and_clamped(client, admin_key):
+    assert _users(client, admin_key, "page=x").status_code == 400
+
+    resp = _users(client, admin_key, "page=0&per_page=1000")
+    assert (resp.json["page"], resp.json["per_page"]) == (1, 100)
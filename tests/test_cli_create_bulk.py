@@ -0,0 +1,84 @@
+# tests/test_cli_create_bulk.py
+import json
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import User
+from scripts import cli
+
+
+@pytest.fixture
+def run_cli(app, monkeypatch):
+    monkeypatch.setattr(cli, "_app", app)
+
+    def run_cli(*args):
+        return CliRunner().invoke(cli.cli, list(args))
+    return run_cli
+
+
+@pytest.fixture
+def users(app):
+    """Return {email: (is_admin, api_key_approved)} for every user"""
+    def users():
+        with app.app_context():
+            rows = db.session.execute(select(User.email, User.is_admin, User.api_key_approved))
+            return {row.email: (row.is_admin, row.api_key_approved) for row in rows}
+    return users
+
+
+def test_csv_import_skips_existing_and_duplicate_emails(tmp_path, run_cli, make_user, users):
+    make_user(email="known@example.com")
+    path = tmp_path / "users.csv"
+    path.write_text(
+        "name,email,admin\n"
+        "Alice,Alice@Example.com,yes\n"
+        "Bob,bob@example.com,\n"
+        "Known,KNOWN@example.com,\n"
+        "Alice again,alice@example.com ,\n"
+        ",nameless@example.com,\n"
+    )
+
+    result = run_cli("create-bulk", str(path))
+
+    assert result.exit_code == 0, result.output
+    assert "Already exists: known@example.com" in result.output
+    assert "Already exists: alice@example.com" in result.output
+    assert "Skipping row" in result.output
+    assert "2 user(s) pending approval" in result.output
+    assert users() == {
+        "known@example.com": (False, True),
+        "alice@example.com": (True, False),
+        "bob@example.com": (False, False),
+    }
+
+
+def test_json_import(tmp_path, run_cli, users):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps([
+        {"name": "Carol", "email": "carol@example.com", "admin": True},
+        {"name": "Carol twin", "email": "CAROL@example.com"},
+        {"name": "Dan", "email": "dan@example.com"},
+    ]))
+
+    result = run_cli("create-bulk", str(path))
+
+    assert result.exit_code == 0, result.output
+    assert result.output.count("API Key (plain)") == 2
+    assert users() == {
+        "carol@example.com": (True, False),
+        "dan@example.com": (False, False),
+    }
+
+
+def test_nothing_new_to_import(tmp_path, run_cli, make_user, users):
+    make_user(email="known@example.com")
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps([{"name": "Known", "email": "known@example.com"}]))
+
+    result = run_cli("create-bulk", str(path))
+
+    assert "No new users to create" in result.output
+    assert list(users()) == ["known@example.com"]
@@ -0,0 +1,87 @@
+# tests/test_email_status.py
+import pytest
+
+from app.api import email_api
+from app.api.email_api import DEFAULT_BOT_LIMIT
+from tests.conftest import auth
+
+EMAIL = {"to": "to@example.com", "subject": "Hi", "email_plain_text": "Hello", "async": True}
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Accept async sends, and run the background job inline"""
+    monkeypatch.setattr(email_api, "is_shared_cache", lambda: True)
+    monkeypatch.setattr(email_api, "run_in_background", lambda func, *args: func(*args))
+
+
+def _status(client, api_key, job_id):
+    return client.get(f"/api/v1/email-status/{job_id}", headers=auth(api_key))
+
+
+def test_async_requires_shared_cache(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user()
+    resp = client.post("/api/v1/send-email", json=EMAIL, headers=auth(api_key))
+
+    assert resp.status_code == 400
+    assert "async" in resp.json["error"]
+    assert smtp.sent == []
+    assert default_usage(user_id) == 0
+
+
+def test_async_send_reports_sent(client, make_user, smtp, shared_cache, default_usage):
+    user_id, api_key = make_user()
+    resp = client.post("/api/v1/send-email", json=EMAIL, headers=auth(api_key))
+
+    assert resp.status_code == 202
+    status = _status(client, api_key, resp.json["job_id"])
+    assert status.status_code == 200
+    assert status.json["status"] == "sent"
+    assert status.json["error"] is None
+    assert default_usage(user_id) == 1
+
+
+def test_failed_async_send_is_refunded(client, make_user, smtp, shared_cache, default_usage):
+    user_id, api_key = make_user()
+    resp = client.post(
+        "/api/v1/send-email", json={**EMAIL, "to": "reject@example.com"}, headers=auth(api_key)
+    )
+
+    status = _status(client, api_key, resp.json["job_id"])
+    assert status.json["status"] == "failed"
+    assert status.json["error"]
+    assert default_usage(user_id) == 0
+
+
+def test_async_sends_cannot_exceed_quota(client, make_user, smtp, monkeypatch, default_usage):
+    monkeypatch.setattr(email_api, "is_shared_cache", lambda: True)
+    queued = []
+    monkeypatch.setattr(email_api, "run_in_background", lambda func, *args: queued.append(args))
+    user_id, api_key = make_user(hermes_default_usage=DEFAULT_BOT_LIMIT - 1)
+
+    first = client.post("/api/v1/send-email", json=EMAIL, headers=auth(api_key))
+    second = client.post("/api/v1/send-email", json=EMAIL, headers=auth(api_key))
+
+    assert first.status_code == 202
+    assert second.status_code == 403
+    assert len(queued) == 1
+    assert default_usage(user_id) == DEFAULT_BOT_LIMIT
+
+
+def test_job_status_is_private_to_its_owner(client, make_user, smtp, shared_cache):
+    _, api_key = make_user()
+    _, other_key = make_user()
+    job_id = client.post("/api/v1/send-email", json=EMAIL, headers=auth(api_key)).json["job_id"]
+
+    assert _status(client, other_key, job_id).status_code == 404
+    assert _status(client, api_key, "unknown-job").status_code == 404
+
+
+def test_sync_send_reports_charged_usage(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user(hermes_default_usage=3)
+    resp = client.post("/api/v1/send-email", json={**EMAIL, "async": False}, headers=auth(api_key))
+
+    assert resp.status_code == 200
+    assert resp.json["hermes_default_usage"]["used"] == 4
+    assert resp.json["hermes_default_usage"]["remaining"] == DEFAULT_BOT_LIMIT - 4
+    assert default_usage(user_id) == 4
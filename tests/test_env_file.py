@@ -0,0 +1,18 @@
+# tests/test_env_file.py
+from scripts.utils import dump_env, load_env
+
+
+def test_quoted_values_are_unquoted_and_untouched_lines_kept(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text('# keys\nFERNET_KEY="abc="\nNAME = \'x y\'\n\nLIMIT=5\n')
+
+    env = load_env(str(path))
+    assert (env["FERNET_KEY"], env["NAME"], env["LIMIT"]) == ("abc=", "x y", "5")
+
+    env["LIMIT"] = "10"
+    env["OLD_FERNET_KEYS"] = "old="
+    dump_env(env, str(path))
+
+    assert path.read_text() == (
+        '# keys\nFERNET_KEY="abc="\nNAME = \'x y\'\n\nLIMIT=10\nOLD_FERNET_KEYS=old=\n'
+    )
@@ -0,0 +1,86 @@
+# tests/test_send_emails.py
+from sqlalchemy import update
+
+from app.api.email_api import DEFAULT_BOT_LIMIT
+from app.extensions import db
+from app.models import User
+from tests.conftest import auth
+
+
+def _batch(count, reject=()):
+    return {"messages": [
+        {
+            "to": f"reject{i}@example.com" if i in reject else f"to{i}@example.com",
+            "subject": "Hi",
+            "email_plain_text": "Hello",
+        }
+        for i in range(count)
+    ]}
+
+
+def test_full_batch_within_quota_is_charged(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user()
+    resp = client.post("/api/v1/send-emails", json=_batch(DEFAULT_BOT_LIMIT), headers=auth(api_key))
+
+    assert resp.status_code == 200
+    assert resp.json["sent"] == DEFAULT_BOT_LIMIT
+    assert resp.json["hermes_default_usage"]["used"] == DEFAULT_BOT_LIMIT
+    assert resp.json["hermes_default_usage"]["remaining"] == 0
+    assert len(smtp.sent) == DEFAULT_BOT_LIMIT
+    assert default_usage(user_id) == DEFAULT_BOT_LIMIT
+
+
+def test_batch_over_quota_is_rejected_without_sending(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user(hermes_default_usage=1)
+    resp = client.post("/api/v1/send-emails", json=_batch(DEFAULT_BOT_LIMIT), headers=auth(api_key))
+
+    assert resp.status_code == 403
+    assert smtp.sent == []
+    assert default_usage(user_id) == 1
+
+
+def test_unsent_messages_are_refunded(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user()
+    resp = client.post("/api/v1/send-emails", json=_batch(4, reject={1, 3}), headers=auth(api_key))
+
+    assert resp.status_code == 200
+    assert (resp.json["sent"], resp.json["failed"]) == (2, 2)
+    assert [r["success"] for r in resp.json["results"]] == [True, False, True, False]
+    assert default_usage(user_id) == 2
+
+
+def test_partial_batch_reports_charged_usage(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user(hermes_default_usage=2)
+    resp = client.post("/api/v1/send-emails", json=_batch(3, reject={2}), headers=auth(api_key))
+
+    assert resp.json["sent"] == 2
+    assert resp.json["hermes_default_usage"]["used"] == 4
+    assert default_usage(user_id) == 4
+
+
+def test_invalid_recipients_are_refunded(client, make_user, smtp, default_usage):
+    user_id, api_key = make_user()
+    batch = _batch(2)
+    batch["messages"][0]["to"] = "not-an-address"
+    resp = client.post("/api/v1/send-emails", json=batch, headers=auth(api_key))
+
+    assert resp.json["sent"] == 1
+    assert default_usage(user_id) == 1
+
+
+def test_null_usage_counts_as_zero(app, client, make_user, smtp, default_usage):
+    user_id, api_key = make_user()
+    with app.app_context():
+        db.session.execute(update(User).where(User.id == user_id).values(hermes_default_usage=None))
+        db.session.commit()
+
+    resp = client.post("/api/v1/send-emails", json=_batch(2), headers=auth(api_key))
+
+    assert resp.status_code == 200
+    assert default_usage(user_id) == 2
+
+
+def test_batch_size_is_validated(client, make_user, smtp):
+    _, api_key = make_user()
+    resp = client.post("/api/v1/send-emails", json={"messages": []}, headers=auth(api_key))
+    assert resp.status_code == 400